@@ -0,0 +1,352 @@
+"""
+Benchmark
+Times the UI hot paths of hand_ui_prototype.py headlessly: synthetic camera frames and
+synthetic hand landmarks go through the same run_frame() as the app, without a webcam,
+a display or MediaPipe. Results are written as JSON and can be compared to a baseline.
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+
+import cv2
+import numpy as np
+
+import hand_ui_prototype as app
+
+BENCH_ITERATIONS = 300  # Timed iterations per case
+BENCH_WARMUP = 30  # Untimed iterations first (caches, pools, text sprites)
+BENCH_BALLS = (20, 500, 5000)  # Balls kept on screen in the game cases
+BENCH_OUT = "benchmark_results.json"
+BENCH_THRESHOLD = 10.0  # Percent slower than the baseline that counts as a regression
+BENCH_NOISE_MS = 0.02  # Smaller differences are never flagged, timer and scheduler noise
+BENCH_METRIC = "p50_ms"  # Statistic compared against the baseline
+BENCH_FPS = 30  # Synthetic capture rate, drives click cooldown and the game clock
+BENCH_SEED = 1
+BENCH_TEXT = "THE WEATHER TODAY "  # Typed over and over in the keyboard case, suggestions included
+
+# Open right hand in normalized camera coordinates, wrist at the origin, fingers up
+HAND_TEMPLATE = np.zeros((21, 3), dtype=np.float32)
+HAND_TEMPLATE[1:5, :2] = [(-0.03, -0.02), (-0.055, -0.04), (-0.075, -0.06), (-0.09, -0.08)]
+for base, x in zip((5, 9, 13, 17), (-0.04, -0.013, 0.013, 0.04)):
+    for joint in range(4):
+        HAND_TEMPLATE[base + joint, :2] = (x, -0.09 - 0.035 * joint)
+
+
+def synthetic_hand(ui_x, ui_y, pinch=False):
+    """Landmarks of a hand whose index tip lands on the UI point (ui_x, ui_y)"""
+    hand = HAND_TEMPLATE.copy()
+    if pinch:
+        hand[4, :2] = hand[8, :2] + 0.005
+    # The UI is mirrored: camera x = 1 - ui x
+    hand[:, 0] += 1 - ui_x / app.UI_WIDTH - hand[8, 0]
+    hand[:, 1] += ui_y / app.UI_HEIGHT - hand[8, 1]
+    return hand
+
+
+def synthetic_bar_hands(ui_x1, ui_x2, ui_y):
+    """Two hands whose palm centers are at (ui_x1, ui_y) and (ui_x2, ui_y)"""
+    palm = HAND_TEMPLATE[app.PALM_POINTS, :2].mean(axis=0)
+    hands = np.repeat(HAND_TEMPLATE[None], 2, axis=0)
+    for hand, ui_x in zip(hands, (ui_x1, ui_x2)):
+        hand[:, 0] += 1 - ui_x / app.UI_WIDTH - palm[0]
+        hand[:, 1] += ui_y / app.UI_HEIGHT - palm[1]
+    return hands
+
+
+def synthetic_frames(count=4, seed=BENCH_SEED):
+    """Camera-sized frames with smooth structure, so nothing compresses or skips unusually well"""
+    rng = np.random.default_rng(seed)
+    frames = []
+    for _ in range(count):
+        noise = rng.integers(0, 256, (app.CAMERA_HEIGHT // 8, app.CAMERA_WIDTH // 8, 3), dtype=np.uint8)
+        frames.append(cv2.resize(noise, (app.CAMERA_WIDTH, app.CAMERA_HEIGHT), interpolation=cv2.INTER_CUBIC))
+    return frames
+
+
+def reset_app(seed=BENCH_SEED):
+    """Fresh app and game state, so cases do not depend on the order they run in"""
+    app.state = app.AppState()
+    app.game = app.GameState(seed=seed)
+    app.gestures = app.GestureClassifier()
+    app.quality.enabled = False  # Full quality, results must not depend on the governor
+    app.completer.learned_path = None  # Typed words must not end up in the user's list
+
+
+# Cases: setup() once, then prepare(i) untimed and run(i) timed per iteration.
+# Frame cases get the landmarks of iteration i from hands_fn(i).
+class FrameCase:
+    """One full run_frame(): input handling, game update, UI rendering"""
+    def __init__(self, name, hands_fn, setup_fn=None, prepare_fn=None):
+        self.name = name
+        self.hands_fn = hands_fn
+        self.setup_fn = setup_fn
+        self.prepare_fn = prepare_fn
+    
+    def setup(self):
+        reset_app()
+        self.frames = synthetic_frames()
+        self.cam_frame = np.empty_like(self.frames[0])
+        self.prev_pinch = False
+        if self.setup_fn:
+            self.setup_fn()
+    
+    def prepare(self, i):
+        np.copyto(self.cam_frame, self.frames[i % len(self.frames)])
+        self.results = app.ReplayResults(self.hands_fn(i))
+        if self.prepare_fn:
+            self.prepare_fn(i)
+    
+    def run(self, i):
+        # Clock starts a second in, so the first pinch is past the click cooldown
+        _, self.prev_pinch = app.run_frame(self.cam_frame, self.results, self.prev_pinch,
+                                           BENCH_FPS, 1 + i / BENCH_FPS)
+
+
+class CallCase:
+    """A single function, called with the iteration number"""
+    def __init__(self, name, fn, setup_fn=None, prepare_fn=None):
+        self.name = name
+        self.fn = fn
+        self.setup_fn = setup_fn
+        self.prepare_fn = prepare_fn
+    
+    def setup(self):
+        reset_app()
+        if self.setup_fn:
+            self.setup_fn()
+    
+    def prepare(self, i):
+        if self.prepare_fn:
+            self.prepare_fn(i)
+    
+    def run(self, i):
+        self.fn(i)
+
+
+def sweep(points, i, period=60):
+    """Cursor moving through points in order, period frames per point"""
+    (x1, y1), (x2, y2) = points[(i // period) % len(points)], points[(i // period + 1) % len(points)]
+    f = (i % period) / period
+    return x1 + (x2 - x1) * f, y1 + (y2 - y1) * f
+
+
+def button_center(btn):
+    return btn.x + btn.w / 2, btn.y + btn.h / 2
+
+
+def menu_hands(i):
+    # Along the main buttons, never pinching (they open browsers)
+    x, y = sweep([button_center(btn) for btn in app.buttons], i)
+    return synthetic_hand(x, y)[None]
+
+
+def keyboard_hands(i):
+    # From key to key of BENCH_TEXT, pinching for the second half of every 12 frames
+    # (past the click cooldown)
+    keys = {btn.label: btn for btn in app.keyboard_buttons}
+    char = BENCH_TEXT[(i // 12) % len(BENCH_TEXT)]
+    x, y = button_center(keys["SPACE" if char == " " else char])
+    return synthetic_hand(x, y, pinch=i % 12 >= 6)[None]
+
+
+def keyboard_setup():
+    app.state.keyboard_visible = True
+
+
+def keyboard_prepare(i):
+    if i % (12 * len(BENCH_TEXT)) == 0:
+        app.state.typed_text = ""
+
+
+def game_bar(i):
+    """Palm x, palm x, y of a bar sweeping left and right across the lower half"""
+    offset = 300 * np.sin(2 * np.pi * i / 90)
+    return 340 + offset, 940 + offset, 560 + 60 * np.cos(2 * np.pi * i / 70)
+
+
+def game_hands(i):
+    return synthetic_bar_hands(*game_bar(i))
+
+
+def game_setup(balls):
+    def setup():
+        app.game.start_game()
+        app.game.balls_spawned = app.game.total_balls  # Balls come from keep_balls() only
+        keep_balls(balls)
+    return setup
+
+
+def keep_balls(balls):
+    """Top the screen up to a fixed number of balls and keep the game from ending"""
+    game = app.game
+    missing = balls - len(game.balls)
+    if missing > 0:
+        x = game.rng.uniform(app.BALL_RADIUS, app.UI_WIDTH - app.BALL_RADIUS, missing)
+        y = game.rng.uniform(0, app.UI_HEIGHT, missing)
+        game.balls.spawn(x, y)
+    if game.sim_time > app.GAME_DURATION - 5:
+        game.ticks = 0
+
+
+def game_over_hands(i):
+    x, y = sweep([button_center(btn) for btn in app.game_over_buttons] + [(640, 200)], i)
+    return synthetic_hand(x, y)[None]
+
+
+def game_over_setup():
+    app.game.start_game()
+    app.game.score, app.game.max_combo = 123, 17
+    app.game.end_game()
+
+
+def button_draw(i):
+    frame = app.frame_pool.get("bench", (app.UI_HEIGHT, app.UI_WIDTH, 3))
+    mask = app.frame_pool.get("bench_mask", (app.UI_HEIGHT, app.UI_WIDTH))
+    for btn in app.keyboard_buttons:
+        btn.draw(frame, mask)
+
+
+def hit_test(i):
+    # A hundred lookups spread over the menu screen
+    for k in range(100):
+        app.widgets.hit_test("menu", ((i * 37 + k * 131) % app.UI_WIDTH, (i * 11 + k * 71) % app.UI_HEIGHT))
+
+
+def game_update(i):
+    # One tick per call, the bar as handle_hands() would report it
+    x1, x2, y = game_bar(i)
+    app.game.update((int(x1), int(y), int(x2), int(y)), i / BENCH_FPS)
+
+
+def build_cases(balls=BENCH_BALLS):
+    cases = [
+        FrameCase("frame_menu", menu_hands),
+        FrameCase("frame_keyboard", keyboard_hands, keyboard_setup, keyboard_prepare),
+    ]
+    for n in balls:
+        cases.append(FrameCase(f"frame_game_{n}", game_hands, game_setup(n), lambda i, n=n: keep_balls(n)))
+    cases.append(FrameCase("frame_game_over", game_over_hands, game_over_setup))
+    cases.append(CallCase("button_draw_keyboard", button_draw))
+    cases.append(CallCase("create_keyboard_buttons", lambda i: app.create_keyboard_buttons()))
+    cases.append(CallCase("hit_test_x100", hit_test))
+    for n in balls:
+        cases.append(CallCase(f"game_update_{n}", game_update, game_setup(n), lambda i, n=n: keep_balls(n)))
+    return cases
+
+
+def measure(case, iterations=BENCH_ITERATIONS, warmup=BENCH_WARMUP):
+    """Per-iteration times of one case, in milliseconds"""
+    case.setup()
+    times = np.empty(iterations)
+    for i in range(warmup + iterations):
+        case.prepare(i)
+        start = time.perf_counter_ns()
+        case.run(i)
+        elapsed = time.perf_counter_ns() - start
+        if i >= warmup:
+            times[i - warmup] = elapsed / 1e6
+    return times
+
+
+def summarize(times):
+    p50, p95, p99 = np.percentile(times, [50, 95, 99])
+    return {"iterations": len(times), "mean_ms": float(times.mean()), "p50_ms": float(p50),
+            "p95_ms": float(p95), "p99_ms": float(p99), "max_ms": float(times.max())}
+
+
+def run_benchmarks(cases, iterations=BENCH_ITERATIONS, warmup=BENCH_WARMUP, verbose=True):
+    results = {}
+    for case in cases:
+        results[case.name] = summarize(measure(case, iterations, warmup))
+        if verbose:
+            r = results[case.name]
+            print(f"{case.name:<26} p50 {r['p50_ms']:8.3f} ms   p95 {r['p95_ms']:8.3f} ms   "
+                  f"p99 {r['p99_ms']:8.3f} ms")
+    return {
+        "meta": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "opencv": cv2.__version__,
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "platform": platform.platform(),
+            "iterations": iterations,
+            "warmup": warmup,
+            "render_scale": app.viewport.render_scale,
+            "output_scale": app.viewport.output_scale,
+            "crisp_text": app.viewport.crisp_text,
+        },
+        "results": results,
+    }
+
+
+def compare(current, baseline, metric=BENCH_METRIC, threshold=BENCH_THRESHOLD):
+    """Print current vs. baseline per case and return the names of the regressed cases"""
+    regressions = []
+    print(f"\n{'case':<26} {'baseline':>10} {'current':>10} {'change':>8}   ({metric})")
+    for name, result in current["results"].items():
+        old = baseline["results"].get(name)
+        if old is None:
+            print(f"{name:<26} {'-':>10} {result[metric]:10.3f}      new")
+            continue
+        change = (result[metric] - old[metric]) / old[metric] * 100 if old[metric] else 0.0
+        regressed = change > threshold and result[metric] - old[metric] > BENCH_NOISE_MS
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<26} {old[metric]:10.3f} {result[metric]:10.3f} {change:+7.1f}%"
+              f"{'   REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Hand-Controlled Desktop UI hot paths headlessly")
+    parser.add_argument("--out", default=BENCH_OUT, metavar="PATH",
+                        help=f"JSON file for the results (default {BENCH_OUT})")
+    parser.add_argument("--baseline", metavar="PATH",
+                        help="compare with earlier results, exit status 1 on a regression")
+    parser.add_argument("--threshold", type=float, default=BENCH_THRESHOLD, metavar="PCT",
+                        help=f"percent slower than the baseline that is a regression (default {BENCH_THRESHOLD:g})")
+    parser.add_argument("--metric", default=BENCH_METRIC, choices=("mean_ms", "p50_ms", "p95_ms", "p99_ms"),
+                        help=f"statistic compared with the baseline (default {BENCH_METRIC})")
+    parser.add_argument("--iterations", type=int, default=BENCH_ITERATIONS, metavar="N",
+                        help=f"timed iterations per case (default {BENCH_ITERATIONS})")
+    parser.add_argument("--warmup", type=int, default=BENCH_WARMUP, metavar="N",
+                        help=f"untimed iterations before each case (default {BENCH_WARMUP})")
+    parser.add_argument("--balls", type=int, nargs="+", default=list(BENCH_BALLS), metavar="N",
+                        help="balls on screen in the game cases (default %(default)s)")
+    parser.add_argument("--cases", nargs="+", metavar="NAME",
+                        help="only run cases whose name contains one of these")
+    parser.add_argument("--render-scale", type=float, default=app.RENDER_SCALE, metavar="S",
+                        help="scene resolution as a fraction of the output (as in the app)")
+    parser.add_argument("--output-scale", type=float, default=app.OUTPUT_SCALE, metavar="S",
+                        help="output size as a multiple of 1280x720 (as in the app)")
+    parser.add_argument("--crisp-text", action="store_true",
+                        help="draw the chrome after the upscale (as in the app)")
+    args = parser.parse_args(argv)
+    
+    app.set_render_scale(args.render_scale, args.output_scale, args.crisp_text)
+    
+    cases = build_cases(args.balls)
+    if args.cases:
+        cases = [case for case in cases if any(part in case.name for part in args.cases)]
+    current = run_benchmarks(cases, args.iterations, args.warmup)
+    with open(args.out, "w") as f:
+        json.dump(current, f, indent=2)
+    print(f"Results written to {args.out}")
+    
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.metric, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) above {args.threshold:g}%: {', '.join(regressions)}")
+            return 1
+        print("No regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,22 +5,117 @@ Includes: Ball Bounce Game with Camera Background!
 """
 
 import cv2
-import mediapipe as mp
 import numpy as np
-import webbrowser
 import time
-import random
-
-# Initialize MediaPipe Hands
-mp_hands = mp.solutions.hands
-mp_drawing = mp.solutions.drawing_utils
-mp_drawing_styles = mp.solutions.drawing_styles
-hands = mp_hands.Hands(
-    static_image_mode=False,
-    max_num_hands=2,  # Changed to 2 for game
-    min_detection_confidence=0.7,
-    min_tracking_confidence=0.5
-)
+import threading
+import argparse
+import struct
+import mmap
+import json
+import tracemalloc
+import os
+import socket
+import stat
+import contextlib
+import functools
+import bisect
+import heapq
+from array import array
+from collections import deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import multiprocessing
+from multiprocessing import resource_tracker, shared_memory
+
+from tracking_client import (TRACKING_MAGIC, TRACKING_MAX_HANDS, TRACKING_RECORD_SIZE, TRACKING_RING_HEADER,
+                             TRACKING_SLOTS, TRACKING_SEQ, TRACKING_SHM_NAME, TRACKING_HELLO, TRACKING_SOCKET_PATH, encode_record,
+                             FLAG_PINCH, FLAG_PINCH_DOWN, FLAG_PINCH_UP, FLAG_CURSOR, FLAG_BAR)
+
+
+# Startup milestones, printed once each relative to startup.begin()
+class StartupTimer:
+    def __init__(self):
+        self.start = None
+        self.marks = {}
+    
+    def begin(self):
+        self.start = time.perf_counter()
+    
+    def mark(self, name):
+        if self.start is None or name in self.marks:
+            return
+        self.marks[name] = time.perf_counter() - self.start
+        print(f"Startup: {name} after {self.marks[name]:.2f} s")
+
+
+startup = StartupTimer()
+
+
+# MediaPipe Hands, imported and built on first use or by warm_up() on a background thread,
+# so importing this module (tests, tools, replays) does not load the model
+class HandModel:
+    def __init__(self):
+        self.mp = None
+        self.hands = None
+        self.lock = threading.Lock()
+        self.ready = threading.Event()  # Set once warm-up has finished, failed or not
+        self.error = None  # Exception of a failed warm-up, raised by check()
+        self.thread = None
+    
+    def solutions(self):
+        """mediapipe.solutions, imported on first use"""
+        if self.mp is None:
+            import mediapipe as mp
+            self.mp = mp
+        return self.mp.solutions
+    
+    def warm_up(self):
+        """Build the graph and run it once on a blank frame, so the first real frame is not the slow one
+        
+        A failure is kept in error instead of dying with the warm-up thread, check() raises it.
+        """
+        with self.lock:
+            if self.ready.is_set():
+                return
+            try:
+                self.hands = self.solutions().hands.Hands(
+                    static_image_mode=False,
+                    max_num_hands=2,  # Changed to 2 for game
+                    min_detection_confidence=0.7,
+                    min_tracking_confidence=0.5
+                )
+                self.hands.process(np.zeros((CAMERA_HEIGHT, CAMERA_WIDTH, 3), dtype=np.uint8))
+            except Exception as e:
+                self.error = e
+            self.ready.set()
+        if self.error is None:
+            startup.mark("hand model ready")
+    
+    def start_warm_up(self):
+        self.thread = threading.Thread(target=self.warm_up, name="model warm-up", daemon=True)
+        self.thread.start()
+    
+    @property
+    def loading(self):
+        """Warming up in the background, frames go on without landmarks meanwhile"""
+        return self.thread is not None and not self.ready.is_set()
+    
+    def check(self):
+        """Raise the warm-up failure, if any, on the calling thread"""
+        if self.error is not None:
+            raise RuntimeError(f"Hand model failed to load: {self.error!r}") from self.error
+    
+    def process(self, image_rgb):
+        if not self.ready.is_set():
+            self.warm_up()
+        self.check()
+        return self.hands.process(image_rgb)
+    
+    def close(self):
+        if self.hands is not None:
+            self.hands.close()
+
+
+hand_model = HandModel()
 
 # UI Configuration
 UI_WIDTH = 1280
@@ -40,162 +135,569 @@ COLOR_TEXT = (255, 255, 255)
 COLOR_KEYBOARD_BG = (50, 50, 50)
 COLOR_KEY = (80, 80, 80)
 COLOR_KEY_HOVER = (120, 120, 180)
+COLOR_NOTICE = (150, 220, 150)
+COLOR_NOTICE_ERROR = (80, 80, 255)
+COLOR_BONE = (224, 224, 224)
+COLOR_JOINT = (0, 0, 255)
 
 # Game Configuration
 GAME_DURATION = 60  # seconds
 TOTAL_BALLS = 20
 BALL_RADIUS = 15
-BALL_SPEED = 5
+BALL_SPEED = 5  # pixels per simulation tick
+BOUNCE_MIN_SPEED = 2  # Pixels per tick a ball leaves the bar with, upward and away from a moving bar
 BAR_THICKNESS = 20
-BALL_SPAWN_INTERVAL = GAME_DURATION / TOTAL_BALLS  # Evenly distribute spawns
+STRESS_BALLS = 5000  # Balls per game in stress mode (--stress)
+SIM_RATE = 30  # Fixed simulation ticks per second, independent of the frame rate
+SIM_MAX_FRAME_TIME = 0.25  # Longest frame gap simulated, avoids a catch-up spiral after stalls
+GAME_SEED = None  # Seed for ball spawns and bounces, None = random (--seed)
+REPLAY_SEED = 0  # Game seed when replaying a session recorded without one
+BALL_COLORS = 64  # Palette size of the pre-rendered ball sprites
+BALL_ANTIALIAS = False  # Smooth sprite edges, blended instead of copied
 
 # Pinch detection threshold
 PINCH_THRESHOLD = 40  # pixels
 
-# Ball class for game
-class Ball:
-    def __init__(self, x, y):
-        self.x = x
-        self.y = y
-        self.vx = random.uniform(-3, 3)  # Random horizontal velocity
-        self.vy = BALL_SPEED  # Constant downward velocity
+# Gesture Configuration
+HANDEDNESS = ("Left", "Right")  # MediaPipe labels, stored as their index (-1 = unknown)
+FINGERTIPS = [4, 8, 12, 16, 20]  # Thumb, index, middle, ring, pinky
+PALM_POINTS = [0, 5, 9, 13, 17]  # Wrist and finger bases
+# MediaPipe's 21 hand connections as chains, drawn as one polyline each
+HAND_BONES = [[0, 1, 2, 3, 4], [0, 5, 6, 7, 8], [9, 10, 11, 12], [13, 14, 15, 16],
+              [0, 17, 18, 19, 20], [5, 9, 13, 17]]
+BONE_THICKNESS = 3  # UI pixels
+JOINT_RADIUS = 5  # UI pixels
+SKELETON_SHIFT = 4  # Fractional bits of the skeleton coordinates, keeps joints at subpixel positions
+# Finger curl: distance base -> tip over base -> middle joint, mapped from straight (0) to curled (1)
+CURL_BASE = [17, 0, 0, 0, 0]
+CURL_JOINT = [2, 6, 10, 14, 18]
+CURL_STRAIGHT = np.array([1.5, 1.25, 1.25, 1.25, 1.25])
+CURL_CURLED = np.array([0.9, 0.75, 0.75, 0.75, 0.75])
+# Per-hand feature vector the gesture table is written against, with the hysteresis
+# margin each bound is widened by once a gesture is active
+GESTURE_FEATURES = {
+    "curl_thumb": 0.1, "curl_index": 0.1, "curl_middle": 0.1, "curl_ring": 0.1, "curl_pinky": 0.1,
+    "pinch_px": 8,  # Thumb to index tip, camera pixels
+    "index_middle_gap": 0.1,  # Index to middle tip, in hand scales
+}
+# Gesture table: name -> {feature: (min, max)}, None leaves a side open. Rows are in label
+# priority order. Adding a row adds no per-frame Python work, all rows are evaluated as
+# one array comparison.
+GESTURES = {
+    "fist": {"curl_index": (0.7, None), "curl_middle": (0.7, None),
+             "curl_ring": (0.7, None), "curl_pinky": (0.7, None)},
+    "pinch": {"pinch_px": (None, PINCH_THRESHOLD)},
+    "open_palm": {"curl_thumb": (None, 0.4), "curl_index": (None, 0.3), "curl_middle": (None, 0.3),
+                  "curl_ring": (None, 0.3), "curl_pinky": (None, 0.3), "pinch_px": (PINCH_THRESHOLD, None)},
+    "scroll": {"curl_index": (None, 0.3), "curl_middle": (None, 0.3), "curl_ring": (0.6, None),
+               "curl_pinky": (0.6, None), "index_middle_gap": (None, 0.35)},
+}
+DRAG_THRESHOLD = 20  # UI pixels the cursor moves with a pinch held before it becomes a drag
+
+# Camera / inference Configuration
+CAMERA_WIDTH = 640
+CAMERA_HEIGHT = 480
+ROI_ENABLED = True  # Run hand inference on a crop around the last known hands (--no-roi)
+ROI_PADDING = 0.5  # Padding around the hands box, as a fraction of its longer side
+ROI_MIN_SIZE = 0.3  # Smallest crop, as a fraction of the shorter frame side
+ROI_MAX_AREA = 0.7  # Crops larger than this fraction of the frame use the full frame
+ROI_REDETECT_INTERVAL = 15  # Full-frame detection every N frames to pick up new hands
+INFERENCE_MAX_SIDE = 640  # Downscale inference input so its longer side fits, None = never
+INFERENCE_INTERVAL = 1  # Run hand inference every Nth frame and predict in between (--infer-every)
+INFERENCE_ADAPTIVE = False  # Skip inference while hands move slowly (--adaptive-inference)
+ADAPTIVE_MAX_INTERVAL = 4  # Most frames per inference in adaptive mode
+ADAPTIVE_MAX_DRIFT = 0.02  # Predicted landmark drift (normalized) that forces a new inference
+CAPTURE_LOW_LATENCY = False  # Grabber thread that keeps only the newest camera frame (--low-latency)
+CAPTURE_BUFFER_SIZE = 1  # Frames the driver may queue in low-latency mode, where the backend allows
+CAPTURE_FOURCC = "MJPG"  # Pixel format asked for in low-latency mode, None = backend default
+LATENCY_WINDOW = 60  # Frames in the rolling capture-to-display latency
+
+# Landmark filter (One-Euro per landmark coordinate, --no-filter)
+FILTER_ENABLED = True
+FILTER_MIN_CUTOFF = 1.0  # Hz, smoothing of a still hand
+FILTER_BETA = 30.0  # Cutoff increase per normalized unit/s of speed, less lag when moving
+FILTER_D_CUTOFF = 1.0  # Hz, smoothing of the speed estimate
+FILTER_MAX_PREDICT = 0.15  # Seconds landmarks are extrapolated past the last inference
+
+# Render scale: geometry, physics, cursor and hit testing stay in UI_WIDTH x UI_HEIGHT units,
+# only the pixels drawn for them change
+RENDER_SCALE = 1.0  # Scene resolution as a fraction of the output, upscaled once per frame (--render-scale)
+OUTPUT_SCALE = 1.0  # Output size (window, video files) in multiples of the UI size (--output-scale)
+CRISP_TEXT = False  # Draw panels, buttons, text and cursor after the upscale, at output resolution (--crisp-text)
+RENDER_INTERPOLATION = cv2.INTER_LINEAR  # Scene upscale, INTER_NEAREST is cheaper but blocky
+
+# Pipeline Configuration
+PIPELINE_ENABLED = True  # False brings back the serial capture -> inference -> render loop
+PIPELINE_STAGES = 3  # 1 = serial, 2 = capture thread + main loop, 3 = capture / inference / render
+PIPELINE_QUEUE_DEPTH = 1  # Items kept per stage queue, oldest is dropped when full
+
+# Startup splash, shown while the camera opens and the hand model warms up
+SPLASH_REFRESH = 0.05  # Seconds between splash redraws
+
+# Multi-source sessions (--sources): one tracking process per camera or video file
+SOURCE_SLOTS = 3  # Frames per source kept in its shared-memory ring, the renderer takes the newest
+SOURCE_POLL = 0.002  # Seconds the renderer sleeps when no source has a new frame
+SOURCE_START_TIMEOUT = 30.0  # Seconds a tracking process gets to open its source
+
+# Quality governor (--frame-budget / --no-governor): drops quality steps, in table order, while
+# frames take longer than the budget and restores them once there is headroom again
+GOVERNOR_ENABLED = True
+GOVERNOR_BUDGET_MS = 33.0  # Work per frame (capture wait excluded)
+GOVERNOR_WINDOW = 15  # Frames averaged before dropping a step
+GOVERNOR_RESTORE_FRAMES = 90  # Frames averaged before restoring a step
+GOVERNOR_HEADROOM = 0.6  # Restore once the average is below this fraction of the budget
+GOVERNOR_INFERENCE_SIDE = 320  # Inference input size once "inference" is dropped
+QUALITY_STEPS = (
+    ("landmarks", "landmark overlay"),
+    ("inference", "inference resolution"),
+    ("camera_bg", "camera background"),
+    ("blending", "HUD blending"),
+)
+
+# Profiling Configuration (--profile / --profile-out, 'p' toggles the overlay)
+PROFILE_WINDOW = 300  # Samples per stage kept for rolling percentiles
+PROFILE_REFRESH = 0.25  # Seconds between percentile updates of the overlay
+PROFILE_STAGES = ("read", "convert", "inference", "landmarks", "background",
+                  "widgets", "game", "display", "total")
+
+# Text rendering cache
+TEXT_CACHE_BYTES = 8 * 1024 * 1024  # Memory cap of the rasterized text sprites
+
+# Word completion: suggestion keys above the virtual keyboard
+WORDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "words.txt")  # Most common first
+WORDS_INDEX_PATH = os.path.splitext(WORDS_PATH)[0] + ".idx"  # Prebuilt trie, rebuilt when older than the list
+LEARNED_WORDS_PATH = os.path.expanduser("~/.hand_ui_words")  # One line per typed word, None = not kept
+SUGGESTION_COUNT = 5  # Suggestion keys, also the completions kept per trie node
+LEARNED_WORD_BOOST = 20000  # Count added per use of a typed word, about the 70th most common word
+ZIPF_TOP_COUNT = 1000000  # Count of the first word when the list has none, count = top / rank
+
+# Button actions: slow ones run on a worker pool and report back as notices
+ACTION_WORKERS = 2
+ACTION_SLOW_MS = 20  # Main-thread actions longer than this are listed in the exit summary
+NOTICE_SECONDS = 3.0  # How long a notice stays above the status bar
+
+# Output sinks (--no-display, --video-out, --raw-out)
+SINK_QUEUE_DEPTH = 4  # Frames buffered per background sink before new ones are dropped
+VIDEO_FPS = 30
+VIDEO_FOURCC = "mp4v"
+
+# Session recording (--record / --replay)
+SESSION_ENCODING = "jpeg"  # "jpeg" or "raw" camera frames
+SESSION_JPEG_QUALITY = 90
+
+def sweep_capsule(x0, y0, dx, dy, ax, ay, bx, by, radius):
+    """Earliest time in [0, 1] at which points moving from (x0, y0) by (dx, dy)
+    come within radius of segment A-B, np.inf where they don't (vectorized)"""
+    t_hit = np.full(np.shape(x0), np.inf)
+    ux, uy = bx - ax, by - ay
+    length_sq = ux * ux + uy * uy
+    px, py = x0 - ax, y0 - ay
+    
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Already touching at the start and moving further in
+        s = np.clip((px * ux + py * uy) / length_sq, 0, 1) if length_sq else 0
+        qx, qy = px - s * ux, py - s * uy
+        touching = (qx * qx + qy * qy <= radius * radius) & (qx * dx + qy * dy < 0)
+        t_hit[touching] = 0
+        
+        # Flat sides of the capsule
+        if length_sq:
+            length = np.sqrt(length_sq)
+            nx, ny = -uy / length, ux / length
+            dist = px * nx + py * ny
+            speed = dx * nx + dy * ny
+            side = np.where(dist >= 0, 1.0, -1.0)
+            t = (side * radius - dist) / speed
+            along = ((px + t * dx) * ux + (py + t * dy) * uy) / length_sq
+            valid = ((np.abs(dist) > radius) & (speed * side < 0) & (t >= 0) & (t <= 1) &
+                     (along >= 0) & (along <= 1))
+            t_hit = np.where(valid, np.minimum(t_hit, t), t_hit)
+        
+        # Rounded ends around both palms
+        a = dx * dx + dy * dy
+        for cx, cy in ((ax, ay), (bx, by)):
+            ox, oy = x0 - cx, y0 - cy
+            b = ox * dx + oy * dy
+            c = ox * ox + oy * oy - radius * radius
+            disc = b * b - a * c
+            t = (-b - np.sqrt(disc)) / a
+            valid = (c > 0) & (disc >= 0) & (a > 0) & (t >= 0) & (t <= 1)
+            t_hit = np.where(valid, np.minimum(t_hit, t), t_hit)
+    return t_hit
+
+
+def scaled(value, scale):
+    """UI units to pixels at a render scale"""
+    return int(round(value * scale))
+
+
+def scaled_thickness(thickness, scale):
+    """Line thickness in pixels at a render scale, never thinner than one pixel"""
+    return max(1, scaled(thickness, scale))
+
+
+# Ball sprite atlas, every palette color rendered once at the ball radius
+class BallSprites:
+    def __init__(self, radius=BALL_RADIUS, colors=BALL_COLORS, antialias=BALL_ANTIALIAS, scale=1.0):
+        self.radius = radius = scaled(radius, scale)
+        self.antialias = antialias
+        self.palette = np.random.default_rng(0).integers(100, 256, (colors, 3))
+        outline = scaled_thickness(2, scale)
+        size = 2 * (radius + outline // 2) + 3  # The outline reaches past the radius
+        self.center = size // 2
+        center = (self.center, self.center)
+        line = cv2.LINE_AA if antialias else cv2.LINE_8
+        
+        # Drawn on black, so anti-aliased edges come out premultiplied
+        self.sprites = np.zeros((colors, size, size, 3), dtype=np.uint8)
+        for sprite, color in zip(self.sprites, self.palette.tolist()):
+            cv2.circle(sprite, center, radius, color, -1, line)
+            cv2.circle(sprite, center, radius, (255, 255, 255), outline, line)
+        self.mask = np.zeros((size, size), dtype=np.uint8)
+        cv2.circle(self.mask, center, radius, 255, -1, line)
+        cv2.circle(self.mask, center, radius, 255, outline, line)
+        self.inv_alpha = cv2.cvtColor(255 - self.mask, cv2.COLOR_GRAY2BGR)
+    
+    def draw(self, frame, xs, ys, index):
+        """Blit sprite index[i] centered at (xs[i], ys[i]), clipped to the frame"""
+        size = self.mask.shape[0]
+        x0, y0 = xs - self.center, ys - self.center
+        x1, y1 = np.maximum(x0, 0), np.maximum(y0, 0)
+        x2 = np.minimum(x0 + size, frame.shape[1])
+        y2 = np.minimum(y0 + size, frame.shape[0])
+        visible = (x1 < x2) & (y1 < y2)
+        sprites, mask, inv_alpha = self.sprites, self.mask, self.inv_alpha
+        for sx, sy, left, top, right, bottom, i in zip(
+                *(a[visible].tolist() for a in (x0, y0, x1, y1, x2, y2, index))):
+            src = (slice(top - sy, bottom - sy), slice(left - sx, right - sx))
+            dst = frame[top:bottom, left:right]
+            if self.antialias:
+                cv2.multiply(dst, inv_alpha[src], dst, scale=1 / 255)
+                cv2.add(dst, sprites[i][src], dst)
+            else:
+                cv2.copyTo(sprites[i][src], mask[src], dst)
+
+
+ball_sprites = BallSprites()
+
+
+# Struct-of-arrays ball storage, every step runs over all balls at once
+class Balls:
+    def __init__(self, capacity=TOTAL_BALLS, rng=None):
         self.radius = BALL_RADIUS
-        self.color = (random.randint(100, 255), random.randint(100, 255), random.randint(100, 255))
-        self.active = True
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.count = 0
+        self.allocate(capacity)
+    
+    def allocate(self, capacity):
+        """(Re)allocate the arrays, keeping the live balls"""
+        n = getattr(self, "count", 0)
+        old = getattr(self, "x", None)
+        x = np.zeros(capacity)
+        y = np.zeros(capacity)
+        prev_x = np.zeros(capacity)
+        prev_y = np.zeros(capacity)
+        vx = np.zeros(capacity)
+        vy = np.zeros(capacity)
+        color = np.zeros(capacity, dtype=np.uint16)  # Index into the sprite palette
+        active = np.zeros(capacity, dtype=bool)
+        if old is not None and n:
+            x[:n], y[:n], vx[:n], vy[:n] = self.x[:n], self.y[:n], self.vx[:n], self.vy[:n]
+            prev_x[:n], prev_y[:n] = self.prev_x[:n], self.prev_y[:n]
+            color[:n], active[:n] = self.color[:n], self.active[:n]
+        self.x, self.y, self.vx, self.vy = x, y, vx, vy
+        self.prev_x, self.prev_y = prev_x, prev_y  # Positions before the last tick
+        self.color, self.active = color, active
+    
+    def __len__(self):
+        return self.count
+    
+    def clear(self):
+        self.count = 0
+    
+    def spawn(self, x, y):
+        """Append balls at the given positions (arrays of equal length)"""
+        k = len(x)
+        n = self.count
+        if n + k > len(self.x):
+            self.allocate(max(2 * len(self.x), n + k))
+        self.x[n:n + k] = self.prev_x[n:n + k] = x
+        self.y[n:n + k] = self.prev_y[n:n + k] = y
+        self.vx[n:n + k] = self.rng.uniform(-3, 3, k)  # Random horizontal velocity
+        self.vy[n:n + k] = BALL_SPEED  # Constant downward velocity
+        self.color[n:n + k] = self.rng.integers(0, len(ball_sprites.palette), k)
+        self.active[n:n + k] = True
+        self.count = n + k
     
     def update(self):
-        """Update ball position"""
-        self.x += self.vx
-        self.y += self.vy
+        """Move all balls one tick, bounce off side walls and deactivate fallen ones"""
+        n = self.count
+        x, y, vx, vy = self.x[:n], self.y[:n], self.vx[:n], self.vy[:n]
+        self.prev_x[:n] = x
+        self.prev_y[:n] = y
+        x += vx
+        y += vy
         
         # Bounce off side walls
-        if self.x - self.radius <= 0 or self.x + self.radius >= UI_WIDTH:
-            self.vx = -self.vx
-            self.x = max(self.radius, min(UI_WIDTH - self.radius, self.x))
+        r = self.radius
+        hit = (x - r <= 0) | (x + r >= UI_WIDTH)
+        np.negative(vx, out=vx, where=hit)
+        np.clip(x, r, UI_WIDTH - r, out=x, where=hit)
         
         # Check if ball fell off screen
-        if self.y - self.radius > UI_HEIGHT:
-            self.active = False
+        self.active[:n] &= y - r <= UI_HEIGHT
+    
+    def bounce_off_bar(self, mask, t, bar_pos, bar_motion=(0, 0)):
+        """Reflect the masked balls off the bar at their contact times t
+        
+        bar_pos is the bar at the start of the tick and bar_motion its move during the tick.
+        Returns how many balls leave the bar moving upward (the scoring hits).
+        """
+        idx = np.flatnonzero(mask)
+        k = len(idx)
+        x0, y0 = self.prev_x[idx], self.prev_y[idx]
+        dx, dy = self.x[idx] - x0, self.y[idx] - y0
+        vx, vy = self.vx[idx], self.vy[idx]
+        mx, my = bar_motion
+        
+        # Contact positions relative to the bar at the start of the tick, and the bar
+        # normal there (from closest bar point to ball)
+        rx, ry = x0 + t * (dx - mx), y0 + t * (dy - my)
+        ax, ay, bx, by = bar_pos
+        ux, uy = bx - ax, by - ay
+        length_sq = ux * ux + uy * uy
+        s = np.clip(((rx - ax) * ux + (ry - ay) * uy) / length_sq, 0, 1) if length_sq else 0
+        nx, ny = rx - (ax + s * ux), ry - (ay + s * uy)
+        norm = np.hypot(nx, ny)
+        norm[norm == 0] = 1
+        nx, ny = nx / norm, ny / norm
+        cx, cy = rx + t * mx, ry + t * my
+        
+        # Reflect the velocity off the normal
+        vn = vx * nx + vy * ny
+        vn = np.minimum(vn, 0)
+        vx = vx - 2 * vn * nx
+        vy = vy - 2 * vn * ny
+        # Leave a moving bar faster than it follows, so it does not hit the ball again next tick
+        short = np.maximum(mx * nx + my * ny + BOUNCE_MIN_SPEED - (vx * nx + vy * ny), 0)
+        vx = vx + short * nx
+        vy = vy + short * ny
+        # Hits on the top of the bar (a rounded end included) always send the ball up, a
+        # glancing hit on an end would otherwise leave it drifting sideways along the bar
+        vy = np.where(ny < 0, np.minimum(vy, -BOUNCE_MIN_SPEED), vy)
+        # Add slight horizontal variation for fun, limit horizontal speed
+        vx = np.clip(vx + self.rng.uniform(-1, 1, k), -8, 8)
+        
+        # Continue the rest of the tick from the contact point
+        self.vx[idx], self.vy[idx] = vx, vy
+        self.x[idx] = cx + (1 - t) * vx
+        self.y[idx] = cy + (1 - t) * vy
+        self.prev_x[idx], self.prev_y[idx] = cx, cy
+        return int(np.count_nonzero(vy < 0))
     
-    def bounce_off_bar(self):
-        """Reverse vertical velocity when bouncing off bar"""
-        self.vy = -abs(self.vy)  # Always bounce upward
-        # Add slight horizontal variation for fun
-        self.vx += random.uniform(-1, 1)
-        self.vx = max(-8, min(8, self.vx))  # Limit horizontal speed
+    def cull(self):
+        """Compact the arrays so only active balls remain"""
+        n = self.count
+        keep = self.active[:n]
+        k = int(np.count_nonzero(keep))
+        if k == n:
+            return
+        for arr in (self.x, self.y, self.prev_x, self.prev_y, self.vx, self.vy, self.color):
+            arr[:k] = arr[:n][keep]
+        self.active[:k] = True
+        self.count = k
     
-    def draw(self, frame):
-        """Draw the ball"""
-        cv2.circle(frame, (int(self.x), int(self.y)), self.radius, self.color, -1)
-        cv2.circle(frame, (int(self.x), int(self.y)), self.radius, (255, 255, 255), 2)
+    def draw(self, frame, alpha=1.0, scale=1.0):
+        """Draw all balls on screen (bounced balls keep flying above it)
+        
+        alpha interpolates between the previous and the current tick, scale maps
+        UI units to frame pixels.
+        """
+        n = self.count
+        xs = (self.prev_x[:n] + (self.x[:n] - self.prev_x[:n]) * alpha) * scale
+        ys = (self.prev_y[:n] + (self.y[:n] - self.prev_y[:n]) * alpha) * scale
+        ball_sprites.draw(frame, xs.astype(int), ys.astype(int), self.color[:n])
 
 
 # Game State class
 class GameState:
-    def __init__(self):
+    def __init__(self, total_balls=TOTAL_BALLS, seed=GAME_SEED):
         self.active = False
         self.game_over = False
-        self.balls = []
+        self.set_ball_count(total_balls)
+        self.seed(seed)
         self.score = 0
         self.combo = 0
         self.max_combo = 0
-        self.start_time = 0
-        self.last_spawn_time = 0
+        self.ticks = 0  # Simulation ticks since the game started
+        self.sim_time = 0  # Simulated seconds since the game started
+        self.last_update = None  # Wall clock of the last real-time update
+        self.accumulator = 0  # Wall time not yet simulated
+        self.alpha = 1.0  # Render interpolation between the last two ticks
         self.balls_spawned = 0
-        self.bar_pos = None  # (x1, y1, x2, y2)
+        self.bar_pos = None  # (x1, y1, x2, y2) as of the last tick
+        self.display_bar = None  # Latest bar from the hands, drawn between ticks
+    
+    def seed(self, seed=None):
+        """Reset the RNG driving ball spawns and bounces"""
+        self.game_seed = seed
+        self.rng = np.random.default_rng(seed)
+        self.balls = Balls(self.total_balls, self.rng)
+    
+    def set_ball_count(self, total_balls):
+        """Configure balls per game, spawns stay evenly spread over the game"""
+        self.total_balls = total_balls
+        self.spawn_interval = GAME_DURATION / total_balls
     
     def start_game(self):
         """Initialize a new game"""
         self.active = True
         self.game_over = False
-        self.balls = []
+        self.balls.clear()
         self.score = 0
         self.combo = 0
         self.max_combo = 0
-        self.start_time = time.time()
-        self.last_spawn_time = time.time()
+        self.ticks = 0
+        self.sim_time = 0
+        self.last_update = None
+        self.accumulator = 0
+        self.alpha = 1.0
         self.balls_spawned = 0
         self.bar_pos = None
+        self.display_bar = None
     
     def reset_game(self):
         """Reset to main menu"""
         self.active = False
         self.game_over = False
-        self.balls = []
+        self.balls.clear()
         self.score = 0
         self.combo = 0
         self.max_combo = 0
         self.balls_spawned = 0
         self.bar_pos = None
+        self.display_bar = None
     
-    def update(self, bar_pos):
-        """Update game state"""
+    def update(self, bar_pos, now=None):
+        """Advance the game by the wall time since the last update in fixed ticks"""
         if not self.active or self.game_over:
             return
         
-        current_time = time.time()
-        elapsed = current_time - self.start_time
+        now = time.perf_counter() if now is None else now
+        if self.last_update is None:
+            self.last_update = now
+        self.accumulator += min(now - self.last_update, SIM_MAX_FRAME_TIME)
+        self.last_update = now
+        
+        # Move the bar gradually over the ticks of this frame; each tick sweeps the balls
+        # against the bar's own motion, so a bar that jumped between two slow frames still
+        # sweeps the space in between
+        tick = 1.0 / SIM_RATE
+        pending = int(self.accumulator / tick)
+        start_bar = self.bar_pos if self.bar_pos and bar_pos else bar_pos
+        for k in range(1, pending + 1):
+            if self.game_over:
+                break
+            f = k / pending
+            self.step(tuple(a + (b - a) * f for a, b in zip(start_bar, bar_pos))
+                      if bar_pos else None)
+            self.accumulator -= tick
+        
+        # The simulated bar only moves in ticks, so motion between ticks is swept by the next one
+        self.display_bar = bar_pos
+        self.alpha = min(1.0, self.accumulator / tick)
+    
+    def step(self, bar_pos):
+        """Advance the simulation by exactly one tick"""
+        self.ticks += 1
+        self.sim_time = self.ticks / SIM_RATE
         
         # Check if game should end
-        if elapsed >= GAME_DURATION:
+        if self.sim_time >= GAME_DURATION:
             self.end_game()
             return
         
-        # Spawn new balls
-        if (self.balls_spawned < TOTAL_BALLS and 
-            current_time - self.last_spawn_time >= BALL_SPAWN_INTERVAL):
-            self.spawn_ball()
-            self.last_spawn_time = current_time
+        # Spawn new balls, several per tick when the interval is shorter than a tick
+        due = min(self.total_balls, int(self.sim_time / self.spawn_interval))
+        if due > self.balls_spawned:
+            self.spawn_balls(due - self.balls_spawned)
         
         # Update bar position
+        prev_bar = self.bar_pos or bar_pos
         self.bar_pos = bar_pos
         
         # Update all balls
-        combo_broken = False
-        for ball in self.balls:
-            if ball.active:
-                ball.update()
-                
-                # Check collision with bar
-                if bar_pos and self.check_bar_collision(ball, bar_pos):
-                    ball.bounce_off_bar()
-                    self.score += 1
-                    self.combo += 1
-                    self.max_combo = max(self.max_combo, self.combo)
+        self.balls.update()
+        
+        # Check collision with bar
+        if bar_pos:
+            motion = ((bar_pos[0] + bar_pos[2] - prev_bar[0] - prev_bar[2]) / 2,
+                      (bar_pos[1] + bar_pos[3] - prev_bar[1] - prev_bar[3]) / 2)
+            hits, t = self.check_bar_collision(prev_bar, motion)
+            if hits.any():
+                n_hits = self.balls.bounce_off_bar(hits, t[hits], prev_bar, motion)
+                self.score += n_hits
+                self.combo += n_hits
+                self.max_combo = max(self.max_combo, self.combo)
         
         # Remove inactive balls
-        self.balls = [b for b in self.balls if b.active]
+        self.balls.cull()
         
         # Check if all balls are gone and no more to spawn
-        if len(self.balls) == 0 and self.balls_spawned >= TOTAL_BALLS:
+        if len(self.balls) == 0 and self.balls_spawned >= self.total_balls:
             self.end_game()
     
-    def spawn_ball(self):
-        """Spawn a new ball at random x position at top"""
-        x = random.randint(BALL_RADIUS + 50, UI_WIDTH - BALL_RADIUS - 50)
-        y = -BALL_RADIUS  # Start above screen
-        self.balls.append(Ball(x, y))
-        self.balls_spawned += 1
-    
-    def check_bar_collision(self, ball, bar_pos):
-        """Check if ball collides with bar"""
-        x1, y1, x2, y2 = bar_pos
-        
-        # Check if ball is near bar vertically
-        if abs(ball.y - y1) > BALL_RADIUS + BAR_THICKNESS:
-            return False
+    def fast_forward(self, bar_trajectory, max_time=GAME_DURATION, seed=None):
+        """Run a whole game headlessly as fast as possible
         
-        # Check if ball is within bar horizontally (with some tolerance)
-        min_x = min(x1, x2)
-        max_x = max(x1, x2)
+        bar_trajectory is called with the simulated time and returns the bar
+        (x1, y1, x2, y2) or None, or is a sequence with one entry per tick.
+        The RNG is reseeded first (with seed, or the game's own seed), so
+        repeated runs give the same game. Returns the final score.
+        """
+        self.seed(self.game_seed if seed is None else seed)
+        self.start_game()
+        while not self.game_over and self.sim_time < max_time:
+            if callable(bar_trajectory):
+                bar_pos = bar_trajectory(self.sim_time)
+            else:
+                bar_pos = bar_trajectory[min(self.ticks, len(bar_trajectory) - 1)]
+            self.step(bar_pos)
+        return self.score
+    
+    def spawn_balls(self, count=1):
+        """Spawn new balls at random x positions at top"""
+        x = self.rng.integers(BALL_RADIUS + 50, UI_WIDTH - BALL_RADIUS - 50 + 1, count)
+        y = np.full(count, -BALL_RADIUS)  # Start above screen
+        self.balls.spawn(x, y)
+        self.balls_spawned += count
+    
+    def check_bar_collision(self, bar_pos, bar_motion=(0, 0)):
+        """Mask of balls whose motion this tick touched the bar, and their contact times
         
-        # Check if ball center is within bar range
-        if min_x - BALL_RADIUS <= ball.x <= max_x + BALL_RADIUS:
-            # Check if ball is moving downward
-            if ball.vy > 0:
-                return True
+        bar_pos is the bar at the start of the tick and bar_motion its move during the tick,
+        taken as a translation of its midpoint. Balls are swept relative to the bar.
+        """
+        balls = self.balls
+        n = balls.count
+        x0, y0 = balls.prev_x[:n], balls.prev_y[:n]
+        x1, y1 = balls.x[:n] - bar_motion[0], balls.y[:n] - bar_motion[1]
+        ax, ay, bx, by = bar_pos
+        # Bar is a capsule: the palm-to-palm segment thickened by half the bar width
+        radius = BALL_RADIUS + BAR_THICKNESS / 2
+        t = np.full(n, np.inf)
         
-        return False
+        # Broad phase: only sweep balls whose path box overlaps the bar box
+        near = (balls.active[:n] &
+                (np.minimum(x0, x1) <= max(ax, bx) + radius) &
+                (np.maximum(x0, x1) >= min(ax, bx) - radius) &
+                (np.minimum(y0, y1) <= max(ay, by) + radius) &
+                (np.maximum(y0, y1) >= min(ay, by) - radius))
+        idx = np.flatnonzero(near)
+        if len(idx):
+            t[idx] = sweep_capsule(x0[idx], y0[idx], x1[idx] - x0[idx], y1[idx] - y0[idx],
+                                   ax, ay, bx, by, radius)
+        return np.isfinite(t), t
     
     def end_game(self):
         """End the game"""
@@ -205,8 +707,172 @@ class GameState:
         """Get remaining time in seconds"""
         if not self.active:
             return 0
-        elapsed = time.time() - self.start_time
-        return max(0, GAME_DURATION - elapsed)
+        return max(0, GAME_DURATION - self.sim_time)
+
+
+@functools.lru_cache(maxsize=1024)
+def text_size(text, scale, thickness, font=cv2.FONT_HERSHEY_SIMPLEX):
+    """Memoized cv2.getTextSize"""
+    return cv2.getTextSize(text, font, scale, thickness)
+
+
+# Rasterized text sprites: each (text, font, scale, color, thickness) goes through putText
+# once, then gets blitted with its mask. Least recently used sprites are evicted past the cap.
+class TextCache:
+    def __init__(self, max_bytes=TEXT_CACHE_BYTES):
+        self.sprites = OrderedDict()  # key -> (sprite, mask, origin inside the sprite)
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def sprite(self, text, font, scale, color, thickness):
+        key = (text, font, scale, color, thickness)
+        entry = self.sprites.get(key)
+        if entry is not None:
+            self.sprites.move_to_end(key)
+            self.hits += 1
+            return entry
+        
+        self.misses += 1
+        (text_w, text_h), baseline = text_size(text, scale, thickness, font)
+        pad = thickness + int(3 * scale) + 2  # Strokes and tall glyphs reach past the getTextSize box
+        shape = (text_h + baseline + 2 * pad, text_w + 2 * pad)
+        sprite = np.zeros(shape + (3,), dtype=np.uint8)
+        mask = np.zeros(shape, dtype=np.uint8)
+        origin = (pad, pad + text_h)
+        cv2.putText(sprite, text, origin, font, scale, color, thickness)
+        cv2.putText(mask, text, origin, font, scale, 255, thickness)
+        
+        entry = (sprite, mask, origin)
+        self.sprites[key] = entry
+        self.bytes += sprite.nbytes + mask.nbytes
+        while self.bytes > self.max_bytes and len(self.sprites) > 1:
+            _, (old_sprite, old_mask, _) = self.sprites.popitem(last=False)
+            self.bytes -= old_sprite.nbytes + old_mask.nbytes
+            self.evictions += 1
+        return entry
+    
+    def draw(self, img, text, org, scale, color, thickness, mask=None, font=cv2.FONT_HERSHEY_SIMPLEX):
+        """Same pixels as cv2.putText at org, optionally also into an alpha mask"""
+        sprite, sprite_mask, (ox, oy) = self.sprite(text, font, scale, tuple(color), thickness)
+        x, y = org[0] - ox, org[1] - oy
+        x1, y1 = max(x, 0), max(y, 0)
+        x2, y2 = min(x + sprite.shape[1], img.shape[1]), min(y + sprite.shape[0], img.shape[0])
+        if x1 >= x2 or y1 >= y2:
+            return
+        src = (slice(y1 - y, y2 - y), slice(x1 - x, x2 - x))
+        cv2.copyTo(sprite[src], sprite_mask[src], img[y1:y2, x1:x2])
+        if mask is not None:
+            cv2.bitwise_or(mask[y1:y2, x1:x2], sprite_mask[src], mask[y1:y2, x1:x2])
+
+
+text_cache = TextCache()
+
+
+# Button actions: instant ones (toggles, typing) run inline on the main thread, slow ones
+# (anything that starts a process, like a browser) on a worker pool so the frame loop never
+# waits. Finished background actions come back as notices on the main thread.
+class ActionDispatcher:
+    def __init__(self, workers=ACTION_WORKERS):
+        self.workers = workers
+        self.pool = None  # Started on the first background action
+        self.lock = threading.Lock()
+        self.in_flight = set()  # Keys of background actions still running
+        self.finished = deque()  # (name, seconds, error) posted by the workers
+        self.timings = {}  # (name, background) -> [runs, total seconds, longest]
+        self.coalesced = 0  # Background actions skipped because the same one was running
+        self.notice = None  # (text, color, expiry time)
+    
+    def submit(self, name, action, background=False, key=None):
+        """Run action now, or on the pool
+        
+        A background action whose key (its arguments, default the name) matches one
+        still running is skipped with a notice instead of queued again.
+        """
+        if not background:
+            start = time.perf_counter()
+            try:
+                return action()
+            finally:
+                self.record(name, time.perf_counter() - start, False)
+        key = (name, key)
+        with self.lock:
+            skipped = key in self.in_flight
+            if skipped:
+                self.coalesced += 1
+            else:
+                self.in_flight.add(key)
+        if skipped:
+            self.notify(f"{name} already running, skipped")
+            return None
+        if self.pool is None:
+            self.pool = ThreadPoolExecutor(self.workers, thread_name_prefix="action")
+        self.pool.submit(self.run_background, name, key, action)
+        self.notify(f"{name}...")
+        return None
+    
+    def run_background(self, name, key, action):
+        start = time.perf_counter()
+        error = None
+        try:
+            action()
+        except Exception as exc:  # Reported as a notice instead of killing the worker silently
+            error = exc
+        with self.lock:
+            self.in_flight.discard(key)
+            self.finished.append((name, time.perf_counter() - start, error))
+    
+    def record(self, name, seconds, background):
+        timing = self.timings.setdefault((name, background), [0, 0.0, 0.0])
+        timing[0] += 1
+        timing[1] += seconds
+        timing[2] = max(timing[2], seconds)
+    
+    def notify(self, text, color=COLOR_NOTICE, now=None):
+        now = time.time() if now is None else now
+        self.notice = (text, color, now + NOTICE_SECONDS)
+    
+    def poll(self, now=None):
+        """Post finished background actions as notices; the current (text, color) or None"""
+        now = time.time() if now is None else now
+        while self.finished:
+            name, seconds, error = self.finished.popleft()
+            self.record(name, seconds, True)
+            if error is not None:
+                self.notify(f"{name} failed: {error}", COLOR_NOTICE_ERROR, now)
+            else:
+                self.notify(f"{name} done ({seconds * 1000:.0f} ms)", COLOR_NOTICE, now)
+        if self.notice is not None and now >= self.notice[2]:
+            self.notice = None
+        return self.notice[:2] if self.notice is not None else None
+    
+    def summary(self):
+        """Lines for background actions and main-thread actions that held up a frame"""
+        lines = []
+        for (name, background), (runs, total, longest) in sorted(self.timings.items()):
+            if background or longest * 1000 > ACTION_SLOW_MS:
+                where = "worker" if background else "main thread"
+                lines.append(f"Action {name} ({where}): {runs} runs, "
+                             f"mean {total / runs * 1000:.0f} ms, max {longest * 1000:.0f} ms")
+        if self.coalesced:
+            lines.append(f"Actions skipped while the same one was running: {self.coalesced}")
+        return lines
+    
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+dispatcher = ActionDispatcher()
+
+
+def open_url(url):
+    """Open url in the default browser; blocks while a browser starts, so dispatch it in the background"""
+    import webbrowser  # Rarely used, kept out of startup
+    if not webbrowser.open(url):
+        raise RuntimeError("no browser found")
 
 
 # Button class for ROI management
@@ -224,32 +890,455 @@ class Button:
     def contains(self, px, py):
         return self.x <= px <= self.x + self.w and self.y <= py <= self.y + self.h
     
-    def draw(self, frame):
-        current_time = time.time()
+    def current_color(self):
+        """Fill color for the current look: click flash, hover or idle"""
         # Flash effect on click
-        if current_time - self.click_time < 0.2:
-            color = COLOR_BUTTON_CLICK
+        if time.time() - self.click_time < 0.2:
+            return COLOR_BUTTON_CLICK
         elif self.is_hovered:
-            color = COLOR_BUTTON_HOVER
-        else:
-            color = COLOR_BUTTON
-        
-        cv2.rectangle(frame, (self.x, self.y), 
-                     (self.x + self.w, self.y + self.h), color, -1)
-        cv2.rectangle(frame, (self.x, self.y), 
-                     (self.x + self.w, self.y + self.h), (200, 200, 200), 2)
+            return COLOR_BUTTON_HOVER
+        return COLOR_BUTTON
+    
+    def draw(self, frame, mask=None, offset=(0, 0), scale=1.0):
+        """Draw the button, optionally also into an alpha mask, at scale pixels per UI unit,
+        shifted by offset pixels"""
+        color = self.current_color()
+        x = scaled(self.x, scale) - offset[0]
+        y = scaled(self.y, scale) - offset[1]
+        w = scaled(self.x + self.w, scale) - scaled(self.x, scale)
+        h = scaled(self.y + self.h, scale) - scaled(self.y, scale)
+        thickness = scaled_thickness(2, scale)
         
         # Center text
-        text_size = cv2.getTextSize(self.label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 2)[0]
-        text_x = self.x + (self.w - text_size[0]) // 2
-        text_y = self.y + (self.h + text_size[1]) // 2
-        cv2.putText(frame, self.label, (text_x, text_y),
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, COLOR_TEXT, 2)
+        label_w, label_h = text_size(self.label, 0.5 * scale, thickness)[0]
+        text_x = x + (w - label_w) // 2
+        text_y = y + (h + label_h) // 2
+        
+        targets = [(frame, color, (200, 200, 200))]
+        if mask is not None:
+            targets.append((mask, 255, 255))
+        for img, fill, border in targets:
+            cv2.rectangle(img, (x, y), (x + w, y + h), fill, -1)
+            cv2.rectangle(img, (x, y), (x + w, y + h), border, thickness)
+        text_cache.draw(frame, self.label, (text_x, text_y), 0.5 * scale, COLOR_TEXT, thickness, mask)
     
     def click(self):
         self.click_time = time.time()
         if self.action:
-            self.action()
+            dispatcher.submit(self.label, self.action)
+
+
+# Retained UI layer: static chrome is rendered once, widgets only when they change.
+# Everything is placed in UI units and rendered at scale pixels per unit.
+class RetainedLayer:
+    def __init__(self, width=UI_WIDTH, height=UI_HEIGHT, dim=None, scale=1.0):
+        self.scale = scale
+        self.width = width = scaled(width, scale)
+        self.height = height = scaled(height, scale)
+        self.dim = dim  # Darken the whole frame by this factor first (overlay screens)
+        self.base = np.zeros((height, width, 3), dtype=np.uint8)
+        self.base_alpha = np.zeros((height, width), dtype=np.uint8)
+        self.image = self.base.copy()
+        self.alpha = self.base_alpha.copy()
+        # Premultiplied color and inverse alpha, so blending is one multiply and one add
+        self.premult = np.zeros((height, width, 3), dtype=np.uint8)
+        self.inv_alpha = np.full((height, width, 3), 255, dtype=np.uint8)
+        self.regions = []  # Slices blended every frame
+        self.widgets = {}  # key -> widget dict
+    
+    def clip(self, x, y, w, h):
+        """Turn a rectangle in UI units into a (rows, cols) pixel slice clipped to the layer"""
+        s = self.scale
+        x1, y1 = max(0, scaled(x, s)), max(0, scaled(y, s))
+        x2, y2 = min(self.width, scaled(x + w, s)), min(self.height, scaled(y + h, s))
+        return (slice(y1, max(y1, y2)), slice(x1, max(x1, x2)))
+    
+    def add_panel(self, x, y, w, h, color, alpha, border_color=None, border=2):
+        """Static semi-transparent rectangle, optionally with an opaque border"""
+        s = self.scale
+        p1, p2 = (scaled(x, s), scaled(y, s)), (scaled(x + w, s), scaled(y + h, s))
+        cv2.rectangle(self.base, p1, p2, color, -1)
+        cv2.rectangle(self.base_alpha, p1, p2, int(round(alpha * 255)), -1)
+        if border_color is not None:
+            cv2.rectangle(self.base, p1, p2, border_color, scaled_thickness(border, s))
+            cv2.rectangle(self.base_alpha, p1, p2, 255, scaled_thickness(border, s))
+        pad = border // 2 + 1
+        self.add_region(self.clip(x - pad, y - pad, w + 2 * pad + 1, h + 2 * pad + 1))
+    
+    def add_text(self, text, org, scale, color, thickness):
+        """Static opaque text"""
+        s = self.scale
+        draw_layer_text(self.base, self.base_alpha, text, (scaled(org[0], s), scaled(org[1], s)),
+                        scale * s, color, scaled_thickness(thickness, s))
+        self.add_region(self.clip(*text_rect(text, org, scale, thickness)))
+    
+    def add_region(self, region):
+        """Blend a region every frame, unless an existing region already covers it"""
+        self.image[region] = self.base[region]
+        self.alpha[region] = self.base_alpha[region]
+        self.refresh_region(region)
+        rows, cols = region
+        for other_rows, other_cols in self.regions:
+            if (other_rows.start <= rows.start and rows.stop <= other_rows.stop and
+                    other_cols.start <= cols.start and cols.stop <= other_cols.stop):
+                return
+        self.regions.append(region)
+    
+    def add_widget(self, key, rect, draw_fn, state_fn=None, standalone=False):
+        """Dynamic element redrawn only when its state changes
+        
+        draw_fn(image, mask, state, origin) draws on views of the widget region,
+        layer pixel coordinates are shifted by origin. rect is in UI units. Standalone
+        widgets lie outside any panel and are blended on their own when visible.
+        """
+        region = self.clip(*rect)
+        self.widgets[key] = {
+            "region": region, "draw": draw_fn, "state_fn": state_fn,
+            "state": None, "standalone": standalone, "visible": True,
+        }
+    
+    def add_button(self, btn, standalone=False):
+        rect = (btn.x - 1, btn.y - 1, btn.w + 3, btn.h + 3)
+        self.add_widget(btn, rect,
+                        lambda img, mask, state, origin, b=btn: b.draw(img, mask, origin, self.scale),
+                        lambda b=btn: (b.current_color(), b.label), standalone)
+    
+    def set_state(self, key, state):
+        """Redraw a widget only if its state differs from what is rendered"""
+        widget = self.widgets[key]
+        if state == widget["state"]:
+            return
+        widget["state"] = state
+        self.redraw(key)
+    
+    def redraw(self, key):
+        rows, cols = self.widgets[key]["region"]
+        self.image[rows, cols] = self.base[rows, cols]
+        self.alpha[rows, cols] = self.base_alpha[rows, cols]
+        # Repaint every widget touching the region in z-order, so overlapping
+        # widgets (e.g. the wide keyboard keys) keep their stacking
+        for widget in self.widgets.values():
+            other_rows, other_cols = widget["region"]
+            if (widget["state"] is not None and
+                    other_rows.start < rows.stop and rows.start < other_rows.stop and
+                    other_cols.start < cols.stop and cols.start < other_cols.stop):
+                # Draw in layer coordinates shifted to the region origin, clipped by the views
+                widget["draw"](self.image[rows, cols], self.alpha[rows, cols], widget["state"],
+                               (cols.start, rows.start))
+        self.refresh_region((rows, cols))
+    
+    def set_visible(self, key, visible):
+        self.widgets[key]["visible"] = visible
+    
+    def refresh_region(self, region):
+        """Recompute premultiplied color and inverse alpha inside a region"""
+        # Expand alpha to 3 channels inside inv_alpha, then invert it there in place
+        alpha = cv2.cvtColor(self.alpha[region], cv2.COLOR_GRAY2BGR, self.inv_alpha[region])
+        cv2.multiply(self.image[region], alpha, self.premult[region], scale=1 / 255)
+        np.subtract(255, alpha, out=alpha)
+    
+    def update(self):
+        """Poll widgets that report their own state (buttons)"""
+        for key, widget in self.widgets.items():
+            if widget["state_fn"] is not None and widget["visible"]:
+                self.set_state(key, widget["state_fn"]())
+    
+    def composite(self, frame):
+        """Blend the layer onto frame, touching only the chrome rectangles"""
+        self.update()
+        if self.dim is not None:
+            cv2.convertScaleAbs(frame, frame, self.dim)
+        for region in self.regions:
+            self.blend(frame, region)
+        for widget in self.widgets.values():
+            if widget["standalone"] and widget["visible"]:
+                self.blend(frame, widget["region"])
+    
+    def blend(self, frame, region):
+        roi = frame[region]
+        if not quality.allows("blending"):
+            cv2.copyTo(self.image[region], self.alpha[region], roi)  # Opaque, one pass
+            return
+        cv2.multiply(roi, self.inv_alpha[region], roi, scale=1 / 255)
+        cv2.add(roi, self.premult[region], roi)
+
+
+def text_rect(text, org, scale, thickness, width=None):
+    """Bounding rectangle (x, y, w, h) of putText output, optionally with a fixed width"""
+    (text_w, text_h), baseline = text_size(text, scale, thickness)
+    if width is not None:
+        text_w = width
+    return (org[0] - thickness, org[1] - text_h - thickness,
+            text_w + 2 * thickness + 1, text_h + baseline + 2 * thickness + 1)
+
+
+def draw_layer_text(img, mask, text, org, scale, color, thickness):
+    """Draw opaque text into a layer image and its alpha mask"""
+    text_cache.draw(img, text, org, scale, color, thickness, mask)
+
+
+def text_widget(layer, key, org, scale, thickness, rect, standalone=False):
+    """Register a text widget whose state is a (text, color) pair"""
+    s = layer.scale
+    def draw(img, mask, state, origin):
+        text, color = state
+        draw_layer_text(img, mask, text, (scaled(org[0], s) - origin[0], scaled(org[1], s) - origin[1]),
+                        scale * s, color, scaled_thickness(thickness, s))
+    layer.add_widget(key, rect, draw, standalone=standalone)
+
+
+# Widget registry: every screen's buttons built once, with a label map for hit testing
+class WidgetRegistry:
+    def __init__(self, width=UI_WIDTH, height=UI_HEIGHT):
+        self.width = width
+        self.height = height
+        self.label_maps = {}  # screen -> (height, width) array of widget labels, 0 = none
+        self.widgets = {}  # screen -> [None, (group, button), ...] indexed by label
+        self.enabled = {}  # group -> bool
+        self.hovered = {}  # screen -> currently hovered button
+    
+    def add(self, screen, group, group_buttons, enabled=True):
+        """Register a group of buttons on a screen, later buttons win where they overlap"""
+        if screen not in self.label_maps:
+            self.label_maps[screen] = np.zeros((self.height, self.width), dtype=np.uint8)
+            self.widgets[screen] = [None]
+            self.hovered[screen] = None
+        label_map = self.label_maps[screen]
+        for btn in group_buttons:
+            self.widgets[screen].append((group, btn))
+            label = len(self.widgets[screen]) - 1
+            # Button.contains() includes both edges
+            label_map[max(0, btn.y):btn.y + btn.h + 1, max(0, btn.x):btn.x + btn.w + 1] = label
+        self.enabled[group] = enabled
+    
+    def set_enabled(self, group, enabled):
+        self.enabled[group] = enabled
+    
+    def hit_test(self, screen, pos):
+        """Button under pos on a screen, or None, in constant time"""
+        if pos is None:
+            return None
+        x, y = int(pos[0]), int(pos[1])
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return None
+        label = self.label_maps[screen][y, x]
+        if label:
+            group, btn = self.widgets[screen][label]
+            if self.enabled[group]:
+                return btn
+        return None
+    
+    def hover(self, screen, pos):
+        """Move the hover highlight to the button under pos"""
+        btn = self.hit_test(screen, pos)
+        previous = self.hovered[screen]
+        if previous is not btn:
+            if previous is not None:
+                previous.is_hovered = False
+            if btn is not None:
+                btn.is_hovered = True
+            self.hovered[screen] = btn
+        return btn
+
+
+# Word index layout: header, then int32 arrays (child start per node + 1, char per node, word per
+# node, top words per node, word offset per word + 1, count per word), then the word bytes
+WORDS_MAGIC = b"HUIWRD01"
+WORDS_INDEX_HEADER = struct.Struct("<8sIIII")  # magic, nodes, words, top words per node, word bytes
+
+
+# Word completion: a prefix trie stored as flat arrays, nodes numbered breadth-first so each
+# node's children are one sorted run, with the top words of every subtree stored at the node.
+# A completion is one binary search per typed letter and a slice. The arrays are memory-mapped
+# from a prebuilt index, so loading parses nothing; words the user typed rank on top of the list.
+class WordCompleter:
+    def __init__(self, words_path=WORDS_PATH, index_path=WORDS_INDEX_PATH,
+                 learned_path=LEARNED_WORDS_PATH, k=SUGGESTION_COUNT):
+        self.words_path = words_path
+        self.index_path = index_path
+        self.learned_path = learned_path
+        self.k = k
+        self.top_k = k + 1  # One spare, the typed word itself is not suggested
+        self.loaded = False
+        self.data = None  # mmap or bytes behind the array views
+        self.learned = {}  # word -> uses
+        self.learned_sorted = []  # Learned words in order, for prefix ranges
+    
+    @staticmethod
+    def read_word_list(path):
+        """{word: count}, counts estimated from the rank where the list gives none"""
+        entries = {}
+        with open(path) as f:
+            for line in f:
+                parts = line.split()
+                if not parts or parts[0].startswith("#"):
+                    continue
+                word = parts[0].lower()
+                if not (word.isascii() and word.isalpha()) or word in entries:
+                    continue
+                rank = len(entries) + 1
+                entries[word] = int(parts[1]) if len(parts) > 1 else max(1, ZIPF_TOP_COUNT // rank)
+        return entries
+    
+    @staticmethod
+    def build_index(entries, top_k):
+        """Index bytes for {word: count}"""
+        words = sorted(entries)  # Word ids in alphabetical order break count ties
+        counts = [entries[word] for word in words]
+        root = [{}, -1]  # children by letter, word id
+        for word_id, word in enumerate(words):
+            node = root
+            for c in word:
+                node = node[0].setdefault(c, [{}, -1])
+            node[1] = word_id
+        
+        # Number nodes breadth-first: node i's children are child_start[i]:child_start[i + 1]
+        nodes, chars, child_start = [root], [0], []
+        for node in nodes:  # Grows while iterating
+            child_start.append(len(nodes))
+            for c in sorted(node[0]):
+                nodes.append(node[0][c])
+                chars.append(ord(c))
+        child_start.append(len(nodes))
+        
+        # Children have higher ids than their parent, so one backwards pass merges subtrees
+        tops = [None] * len(nodes)
+        for i in range(len(nodes) - 1, -1, -1):
+            candidates = [nodes[i][1]] if nodes[i][1] >= 0 else []
+            for child in range(child_start[i], child_start[i + 1]):
+                candidates.extend(tops[child])
+            tops[i] = heapq.nsmallest(top_k, candidates, key=lambda w: (-counts[w], w))
+        node_top = array("i", [-1]) * (len(nodes) * top_k)
+        for i, top in enumerate(tops):
+            node_top[i * top_k:i * top_k + len(top)] = array("i", top)
+        
+        blob = "".join(words).encode("ascii")
+        offsets = [0]
+        for word in words:
+            offsets.append(offsets[-1] + len(word))
+        header = WORDS_INDEX_HEADER.pack(WORDS_MAGIC, len(nodes), len(words), top_k, len(blob))
+        arrays = [array("i", child_start), array("i", chars), array("i", [node[1] for node in nodes]),
+                  node_top, array("i", offsets), array("i", counts)]
+        return header + b"".join(a.tobytes() for a in arrays) + blob
+    
+    def attach(self, data):
+        """Point the array views into index data, False if it is not a usable index"""
+        view = memoryview(data)
+        if len(view) < WORDS_INDEX_HEADER.size:
+            return False
+        magic, n_nodes, n_words, top_k, blob_size = WORDS_INDEX_HEADER.unpack_from(view, 0)
+        lengths = (n_nodes + 1, n_nodes, n_nodes, n_nodes * top_k, n_words + 1, n_words)
+        if (magic != WORDS_MAGIC or top_k != self.top_k or
+                len(view) != WORDS_INDEX_HEADER.size + 4 * sum(lengths) + blob_size):
+            return False
+        offset = WORDS_INDEX_HEADER.size
+        arrays = []
+        for length in lengths:
+            arrays.append(view[offset:offset + 4 * length].cast("i"))
+            offset += 4 * length
+        (self.child_start, self.node_char, self.node_word,
+         self.node_top, self.word_offset, self.word_count) = arrays
+        self.blob = view[offset:]
+        self.data = data
+        return True
+    
+    def load(self):
+        """Map the index, building it first if it is missing or older than the word list"""
+        self.loaded = True
+        try:
+            if os.path.getmtime(self.index_path) >= os.path.getmtime(self.words_path):
+                with open(self.index_path, "rb") as f:
+                    if self.attach(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)):
+                        return self.load_learned()
+        except (OSError, ValueError):
+            pass  # Missing, empty or unreadable index
+        
+        entries = self.read_word_list(self.words_path) if os.path.exists(self.words_path) else {}
+        data = self.build_index(entries, self.top_k)
+        try:
+            partial = self.index_path + ".tmp"
+            with open(partial, "wb") as f:
+                f.write(data)
+            os.replace(partial, self.index_path)
+        except OSError:
+            pass  # Read-only install, the index lives in memory this run
+        self.attach(data)
+        self.load_learned()
+    
+    def load_learned(self):
+        if self.learned_path and os.path.exists(self.learned_path):
+            try:
+                with open(self.learned_path) as f:
+                    for line in f:
+                        if line.strip():
+                            self.add_learned(line.strip())
+            except OSError:
+                pass
+    
+    def add_learned(self, word):
+        if word not in self.learned:
+            bisect.insort(self.learned_sorted, word)
+        self.learned[word] = self.learned.get(word, 0) + 1
+    
+    def learn(self, word):
+        """Count one use of a typed word, kept across runs in learned_path"""
+        word = word.lower()
+        if not (word.isascii() and word.isalpha()):
+            return
+        if not self.loaded:
+            self.load()
+        self.add_learned(word)
+        if self.learned_path:
+            try:
+                with open(self.learned_path, "a") as f:
+                    f.write(word + "\n")
+            except OSError:
+                pass
+    
+    def find(self, prefix):
+        """Trie node spelling prefix, or -1"""
+        node = 0
+        child_start, node_char = self.child_start, self.node_char
+        for c in map(ord, prefix):
+            end = child_start[node + 1]
+            node = bisect.bisect_left(node_char, c, child_start[node], end)
+            if node == end or node_char[node] != c:
+                return -1
+        return node
+    
+    def word(self, word_id):
+        return self.blob[self.word_offset[word_id]:self.word_offset[word_id + 1]].tobytes().decode("ascii")
+    
+    def count(self, word):
+        """Count of a word in the list, 0 if it is not in it"""
+        node = self.find(word)
+        word_id = self.node_word[node] if node >= 0 else -1
+        return self.word_count[word_id] if word_id >= 0 else 0
+    
+    def complete(self, prefix, k=None):
+        """Most common words starting with prefix, best first, without prefix itself"""
+        if not self.loaded:
+            self.load()
+        prefix = prefix.lower()
+        k = self.k if k is None else min(k, self.k)
+        scores = {}
+        node = self.find(prefix)
+        if node >= 0:
+            for word_id in self.node_top[node * self.top_k:(node + 1) * self.top_k]:
+                if word_id < 0:
+                    break
+                scores[self.word(word_id)] = self.word_count[word_id]
+        # Learned words sort between prefix and prefix + "{" ("{" comes after "z")
+        lo = bisect.bisect_left(self.learned_sorted, prefix)
+        hi = bisect.bisect_left(self.learned_sorted, prefix + "{", lo)
+        for word in self.learned_sorted[lo:hi]:
+            base = scores[word] if word in scores else self.count(word)
+            scores[word] = base + self.learned[word] * LEARNED_WORD_BOOST
+        scores.pop(prefix, None)
+        return sorted(scores, key=lambda w: (-scores[w], w))[:k]
+
+
+completer = WordCompleter()
 
 
 # Application state
@@ -261,6 +1350,8 @@ class AppState:
         self.click_cooldown = 0.3  # seconds
         self.show_camera_bg = True  # Toggle for camera background
         self.show_hand_landmarks = True  # Toggle for hand detection visualization
+        self.suggestion_prefix = ""  # Word the suggestions were computed for
+        self.suggestion_words = []
     
     def toggle_keyboard(self):
         self.keyboard_visible = not self.keyboard_visible
@@ -275,49 +1366,276 @@ class AppState:
         if char == "BACK":
             self.typed_text = self.typed_text[:-1]
         elif char == "SPACE":
+            completer.learn(self.current_word())
             self.typed_text += " "
         elif char == "ENTER":
+            completer.learn(self.current_word())
             self.typed_text += "\n"
         else:
             self.typed_text += char
     
+    def current_word(self):
+        """Word being typed: the letters after the last space or line break"""
+        words = self.typed_text.split()
+        return words[-1] if words and not self.typed_text[-1].isspace() else ""
+    
+    def suggestions(self):
+        """Completions of the current word, looked up again only when it changes"""
+        prefix = self.current_word()
+        if prefix != self.suggestion_prefix:
+            self.suggestion_prefix = prefix
+            self.suggestion_words = [word.upper() for word in completer.complete(prefix)] if prefix else []
+        return self.suggestion_words
+    
+    def accept_suggestion(self, index):
+        """Replace the current word with a suggestion and start the next word"""
+        words = self.suggestions()
+        if index < len(words):
+            self.typed_text = self.typed_text[:len(self.typed_text) - len(self.current_word())] + words[index] + " "
+            completer.learn(words[index])
+    
     def open_browser(self):
-        webbrowser.open("https://www.google.com")
+        dispatcher.submit("Browser", lambda: open_url("https://www.google.com"), background=True)
     
     def google_search(self):
         if self.typed_text.strip():
+            # Query taken now, typing can go on while the browser starts
             query = self.typed_text.strip().replace(" ", "+")
-            webbrowser.open(f"https://www.google.com/search?q={query}")
+            dispatcher.submit("Search", lambda: open_url(f"https://www.google.com/search?q={query}"),
+                              background=True, key=query)
     
-    def can_click(self):
-        current_time = time.time()
+    def can_click(self, now=None):
+        current_time = time.time() if now is None else now
         if current_time - self.last_click_time > self.click_cooldown:
             self.last_click_time = current_time
             return True
         return False
 
 
+# Per-stage timings: ring buffers with rolling percentiles, overlay and file export
+class StageProfiler:
+    def __init__(self, window=PROFILE_WINDOW):
+        self.enabled = False
+        self.show_overlay = False
+        self.window = window
+        self.samples = {stage: np.zeros(window) for stage in PROFILE_STAGES}
+        self.counts = dict.fromkeys(PROFILE_STAGES, 0)
+        self.last = dict.fromkeys(PROFILE_STAGES, 0.0)
+        self.stats = {}
+        self.stats_time = 0
+        self.out = None
+        self.out_format = None
+        self.frame_index = 0
+        self.trace_allocs = False
+        self.alloc_kb = np.zeros(window)  # Peak temporary allocations per frame
+        self.alloc_base = 0
+    
+    def mark(self):
+        """Start time for add(), free when profiling is off"""
+        return time.perf_counter() if self.enabled else 0.0
+    
+    def add(self, stage, start, exclude=()):
+        """Record the time since start for a stage, minus the last samples of the exclude stages"""
+        if not self.enabled or not start:
+            return  # Off, or switched on after start was taken
+        ms = (time.perf_counter() - start) * 1000
+        for name in exclude:
+            ms -= self.last[name]
+        i = self.counts[stage]
+        self.samples[stage][i % self.window] = ms
+        self.counts[stage] = i + 1
+        self.last[stage] = ms
+    
+    def percentiles(self):
+        """{stage: (p50, p95, p99)} in ms over the ring buffers"""
+        stats = {}
+        for stage in PROFILE_STAGES:
+            n = min(self.counts[stage], self.window)
+            if n:
+                stats[stage] = tuple(np.percentile(self.samples[stage][:n], (50, 95, 99)).tolist())
+        return stats
+    
+    def open_export(self, path):
+        """Stream one row of stage timings per frame to a .csv or .jsonl file"""
+        self.enabled = True
+        self.out_format = "csv" if path.endswith(".csv") else "jsonl"
+        self.out = open(path, "w")
+        if self.out_format == "csv":
+            self.out.write("frame,time," + ",".join(PROFILE_STAGES) + "\n")
+    
+    def trace_allocations(self):
+        """Measure the peak of temporary NumPy / Python allocations in every frame"""
+        self.enabled = True
+        self.trace_allocs = True
+        tracemalloc.start()
+        self.alloc_base = tracemalloc.get_traced_memory()[0]
+    
+    def end_frame(self):
+        if self.trace_allocs:
+            current, peak = tracemalloc.get_traced_memory()
+            self.alloc_kb[self.frame_index % self.window] = (peak - self.alloc_base) / 1024
+            tracemalloc.reset_peak()
+            self.alloc_base = current
+        if self.out is None:
+            self.frame_index += 1
+            return
+        if self.out_format == "csv":
+            self.out.write(f"{self.frame_index},{time.time():.6f}," +
+                           ",".join(f"{self.last[stage]:.3f}" for stage in PROFILE_STAGES) + "\n")
+        else:
+            row = {"frame": self.frame_index, "time": round(time.time(), 6)}
+            row.update((stage, round(self.last[stage], 3)) for stage in PROFILE_STAGES)
+            self.out.write(json.dumps(row) + "\n")
+        self.frame_index += 1
+    
+    def toggle_overlay(self):
+        self.show_overlay = not self.show_overlay
+        if self.show_overlay:
+            self.enabled = True
+    
+    def draw_overlay(self, frame):
+        """Percentile table in the bottom right corner"""
+        now = time.time()
+        if now - self.stats_time > PROFILE_REFRESH:
+            self.stats = self.percentiles()
+            self.stats_time = now
+        
+        lookups = text_cache.hits + text_cache.misses
+        footer = [f"text: {len(text_cache.sprites)} sprites {text_cache.bytes // 1024} KB, "
+                  f"{100 * text_cache.hits / max(lookups, 1):.0f}% hits"]
+        if self.trace_allocs:
+            n = min(self.frame_index, self.window)
+            temp_kb = np.median(self.alloc_kb[:n]) if n else 0
+            footer.append(f"buffers: {frame_pool.allocations}  temp: {temp_kb:.0f} KB/frame")
+        
+        # Laid out in UI units, drawn at the frame's scale
+        s = frame.shape[1] / UI_WIDTH
+        font_scale, thickness = 0.45 * s, scaled_thickness(1, s)
+        line_h = 20
+        w, h = 320, line_h * (len(PROFILE_STAGES) + 1 + len(footer)) + 12
+        x, y = UI_WIDTH - w - 10, UI_HEIGHT - 50 - h
+        roi = frame[scaled(y, s):scaled(y + h, s), scaled(x, s):scaled(x + w, s)]
+        cv2.convertScaleAbs(roi, roi, 0.3)
+        columns = [scaled(col, s) for col in (x + 8, x + 130, x + 195, x + 260)]
+        for col, label in zip(columns, ("stage (ms)", "p50", "p95", "p99")):
+            text_cache.draw(frame, label, (col, scaled(y + line_h, s)), font_scale, (180, 180, 180), thickness)
+        for i, stage in enumerate(PROFILE_STAGES):
+            values = self.stats.get(stage, (0, 0, 0))
+            row_y = scaled(y + line_h * (i + 2), s)
+            text_cache.draw(frame, stage, (columns[0], row_y), font_scale, COLOR_TEXT, thickness)
+            for col, value in zip(columns[1:], values):
+                text_cache.draw(frame, f"{value:.2f}", (col, row_y), font_scale, COLOR_TEXT, thickness)
+        for i, line in enumerate(footer):
+            row_y = scaled(y + line_h * (len(PROFILE_STAGES) + 2 + i), s)
+            cv2.putText(frame, line, (columns[0], row_y), cv2.FONT_HERSHEY_SIMPLEX, font_scale,
+                        (180, 180, 180), thickness)
+    
+    def close(self):
+        if self.out is not None:
+            self.out.close()
+            self.out = None
+
+
+# Per-frame buffers allocated once and reused, allocations counts every (re)allocation
+class FramePool:
+    def __init__(self):
+        self.buffers = {}
+        self.allocations = 0
+    
+    def get(self, name, shape, dtype=np.uint8):
+        """Reusable buffer, contents are whatever the last frame left"""
+        buf = self.buffers.get(name)
+        if buf is None or buf.shape != shape or buf.dtype != dtype:
+            buf = np.empty(shape, dtype)
+            self.buffers[name] = buf
+            self.allocations += 1
+        return buf
+    
+    def filled(self, color, shape):
+        """Buffer filled with a solid color, to be copied instead of filled every frame"""
+        key = ("fill", color)
+        buf = self.buffers.get(key)
+        if buf is None or buf.shape != shape:
+            buf = self.get(key, shape)
+            buf[:] = color
+        return buf
+
+
+# Pixel targets of one UI frame. The scene (background, balls, bar) is drawn at the render
+# scale and upscaled once to the output size. Chrome (panels, buttons, text, cursor) goes on
+# the scene before the upscale, or with crisp text after it, at output resolution.
+class Viewport:
+    def __init__(self, render_scale=RENDER_SCALE, output_scale=OUTPUT_SCALE, crisp_text=CRISP_TEXT):
+        self.render_scale = render_scale
+        self.output_scale = output_scale
+        self.crisp_text = crisp_text
+        self.scene = None
+        self.deferred = []  # Chrome drawn after the upscale
+    
+    @property
+    def scene_scale(self):
+        """Scene pixels per UI unit"""
+        return self.output_scale * self.render_scale
+    
+    @property
+    def chrome_scale(self):
+        """Chrome pixels per UI unit"""
+        return self.output_scale if self.crisp_text else self.scene_scale
+    
+    def shape(self, scale):
+        return (scaled(UI_HEIGHT, scale), scaled(UI_WIDTH, scale), 3)
+    
+    def begin(self):
+        """Scene frame to draw the next UI frame into"""
+        self.deferred.clear()
+        self.scene = frame_pool.get("ui", self.shape(self.scene_scale))
+        return self.scene
+    
+    def overlay(self, frame, draw):
+        """Run draw(frame) for chrome: on the scene frame now, or on the output frame with crisp text"""
+        if self.crisp_text:
+            self.deferred.append(draw)
+        else:
+            draw(frame)
+    
+    def finish(self):
+        """Output frame: the scene upscaled once, then the deferred chrome on top"""
+        shape = self.shape(self.output_scale)
+        frame = self.scene
+        if frame.shape != shape:
+            frame = frame_pool.get("output", shape)
+            cv2.resize(self.scene, (shape[1], shape[0]), frame, interpolation=RENDER_INTERPOLATION)
+        for draw in self.deferred:
+            draw(frame)
+        self.deferred.clear()
+        return frame
+
+
 # Initialize app state and game state
 state = AppState()
 game = GameState()
+profiler = StageProfiler()
+frame_pool = FramePool()
+viewport = Viewport()
 
 # Create main buttons - adjusted for more buttons
+# Actions look up state / game when clicked, so they follow the active source session
 buttons = []
 button_y = BUTTON_MARGIN
 button_width = 130
 
 buttons.append(Button(BUTTON_MARGIN, button_y, button_width, BUTTON_HEIGHT,
-                     "Keyboard", state.toggle_keyboard))
+                     "Keyboard", lambda: state.toggle_keyboard()))
 buttons.append(Button(BUTTON_MARGIN + (button_width + 10) * 1, button_y, button_width, 
-                     BUTTON_HEIGHT, "Browser", state.open_browser))
+                     BUTTON_HEIGHT, "Browser", lambda: state.open_browser()))
 buttons.append(Button(BUTTON_MARGIN + (button_width + 10) * 2, button_y, button_width,
-                     BUTTON_HEIGHT, "Search", state.google_search))
+                     BUTTON_HEIGHT, "Search", lambda: state.google_search()))
 buttons.append(Button(BUTTON_MARGIN + (button_width + 10) * 3, button_y, button_width,
-                     BUTTON_HEIGHT, "Ball Game", game.start_game))
+                     BUTTON_HEIGHT, "Ball Game", lambda: game.start_game()))
 buttons.append(Button(BUTTON_MARGIN + (button_width + 10) * 4, button_y, button_width,
-                     BUTTON_HEIGHT, "Camera BG", state.toggle_camera_bg))
+                     BUTTON_HEIGHT, "Camera BG", lambda: state.toggle_camera_bg()))
 buttons.append(Button(BUTTON_MARGIN + (button_width + 10) * 5, button_y, button_width,
-                     BUTTON_HEIGHT, "Show Hands", state.toggle_landmarks))
+                     BUTTON_HEIGHT, "Show Hands", lambda: state.toggle_landmarks()))
 
 # Keyboard layout
 keyboard_keys = [
@@ -352,21 +1670,124 @@ def create_keyboard_buttons():
     return kb_buttons
 
 
-def calculate_distance(p1, p2):
-    """Calculate Euclidean distance between two points"""
-    return np.sqrt((p1[0] - p2[0])**2 + (p1[1] - p2[1])**2)
+def create_suggestion_buttons():
+    """Suggestion keys in a row over the keyboard, between it and the text input"""
+    row_width = len(keyboard_keys[0]) * (KEY_SIZE + KEY_MARGIN)
+    start_x = (UI_WIDTH - row_width) // 2
+    w = (row_width - SUGGESTION_COUNT * KEY_MARGIN) // SUGGESTION_COUNT  # Same span as the top key row
+    # Labels are set every frame from the word being typed, empty keys are hidden
+    return [Button(start_x + i * (w + KEY_MARGIN), 157, w, 36, "",
+                   lambda i=i: state.accept_suggestion(i))
+            for i in range(SUGGESTION_COUNT)]
+
+
+keyboard_buttons = create_keyboard_buttons()
+suggestion_buttons = create_suggestion_buttons()
+
+# Game over buttons
+game_over_buttons = [
+    Button(UI_WIDTH//2 - 250, 450, 200, 60, "Play Again", lambda: game.start_game()),
+    Button(UI_WIDTH//2 + 50, 450, 200, 60, "Exit to Menu", lambda: game.reset_game()),
+]
+
+widgets = WidgetRegistry()
+widgets.add("menu", "buttons", buttons)
+widgets.add("menu", "keyboard", keyboard_buttons, enabled=state.keyboard_visible)
+widgets.add("menu", "suggestions", suggestion_buttons, enabled=state.keyboard_visible)
+widgets.add("game_over", "game_over", game_over_buttons)
+
+input_y = button_y + BUTTON_HEIGHT + BUTTON_MARGIN
+status_y = UI_HEIGHT - 40
+INSTRUCTION_TEXT = "SHOW BOTH HANDS TO CREATE BAR!"
+INSTRUCTION_ORG = (UI_WIDTH//2 - 300, UI_HEIGHT//2)
+
+
+def build_main_chrome(scale=1.0):
+    """Pre-render the main UI chrome: title bar, buttons, text input, keyboard, status bar"""
+    layer = RetainedLayer(scale=scale)
+    
+    # Title bar with semi-transparent background
+    layer.add_panel(0, 0, UI_WIDTH, 80, (60, 60, 60), 0.8, border=0)
+    layer.add_text("HAND-CONTROLLED DESKTOP UI", (20, 50), 1.2, COLOR_TEXT, 2)
+    
+    # Main buttons
+    for btn in buttons:
+        layer.add_button(btn)
+    
+    # Text input display
+    layer.add_panel(BUTTON_MARGIN, input_y, UI_WIDTH - 2 * BUTTON_MARGIN, 60,
+                    (60, 60, 60), 0.8, border_color=(150, 150, 150))
+    layer.add_text("Text Input:", (BUTTON_MARGIN + 10, input_y + 25), 0.6, (180, 180, 180), 1)
+    text_widget(layer, "typed_text", (BUTTON_MARGIN + 10, input_y + 50), 0.7, 2,
+                (BUTTON_MARGIN + 2, input_y + 28, UI_WIDTH - 2 * BUTTON_MARGIN - 3, 30))
+    
+    # Virtual keyboard
+    for kb_btn in keyboard_buttons + suggestion_buttons:
+        layer.add_button(kb_btn, standalone=True)
+    
+    # Status bar
+    layer.add_panel(0, status_y, UI_WIDTH, UI_HEIGHT - status_y, (50, 50, 50), 0.8, border=0)
+    text_widget(layer, "status", (20, status_y + 25), 0.6, 1,
+                (0, status_y + 1, UI_WIDTH, UI_HEIGHT - status_y - 1))
+    
+    # Action notices, just above the status bar
+    text_widget(layer, "notice", (20, status_y - 12), 0.6, 2,
+                (0, status_y - 34, UI_WIDTH, 32), standalone=True)
+    return layer
+
+
+def build_hud_chrome(scale=1.0):
+    """Pre-render the game HUD: stats bar and the two-hands hint"""
+    layer = RetainedLayer(scale=scale)
+    
+    # Top bar with stats
+    layer.add_panel(0, 0, UI_WIDTH, 80, (40, 40, 40), 0.7, border=0)
+    text_widget(layer, "score", (20, 50), 1.2, 3, (0, 1, 340, 78))
+    text_widget(layer, "combo", (350, 50), 1.2, 3, (340, 1, 350, 78))
+    text_widget(layer, "time", (700, 50), 1.2, 3, (690, 1, 300, 78))
+    text_widget(layer, "balls", (1000, 50), 1.2, 3, (990, 1, UI_WIDTH - 990, 78))
+    
+    # Instructions if no bar detected
+    text_widget(layer, "instruction", INSTRUCTION_ORG, 1.0, 2,
+                text_rect(INSTRUCTION_TEXT, INSTRUCTION_ORG, 1.0, 2), standalone=True)
+    layer.set_state("instruction", (INSTRUCTION_TEXT, (0, 0, 255)))
+    return layer
 
 
-def detect_pinch(hand_landmarks, frame_width, frame_height):
-    """Detect thumb-index pinch gesture"""
-    thumb_tip = hand_landmarks.landmark[4]
-    index_tip = hand_landmarks.landmark[8]
+def build_game_over_chrome(scale=1.0):
+    """Pre-render the game over overlay: dimming, title, stats and buttons"""
+    layer = RetainedLayer(dim=0.3, scale=scale)
+    
+    # Game Over text
+    layer.add_text("GAME OVER!", (UI_WIDTH//2 - 200, 150), 2.0, (0, 0, 255), 4)
     
-    thumb_px = (int(thumb_tip.x * frame_width), int(thumb_tip.y * frame_height))
-    index_px = (int(index_tip.x * frame_width), int(index_tip.y * frame_height))
+    # Stats
+    text_widget(layer, "final_score", (UI_WIDTH//2 - 150, 280), 1.5, 3,
+                (UI_WIDTH//2 - 160, 232, 640, 70), standalone=True)
+    text_widget(layer, "max_combo", (UI_WIDTH//2 - 150, 360), 1.5, 3,
+                (UI_WIDTH//2 - 160, 312, 640, 70), standalone=True)
     
-    distance = calculate_distance(thumb_px, index_px)
-    return distance < PINCH_THRESHOLD, distance
+    # Buttons
+    for btn in game_over_buttons:
+        layer.add_button(btn, standalone=True)
+    return layer
+
+
+main_chrome = build_main_chrome()
+hud_chrome = build_hud_chrome()
+game_over_chrome = build_game_over_chrome()
+
+
+def set_render_scale(render_scale=RENDER_SCALE, output_scale=OUTPUT_SCALE, crisp_text=CRISP_TEXT):
+    """Switch the viewport and rebuild what is pre-rendered at a pixel size: chrome and ball sprites"""
+    global main_chrome, hud_chrome, game_over_chrome, ball_sprites
+    viewport.render_scale = render_scale
+    viewport.output_scale = output_scale
+    viewport.crisp_text = crisp_text
+    main_chrome = build_main_chrome(viewport.chrome_scale)
+    hud_chrome = build_hud_chrome(viewport.chrome_scale)
+    game_over_chrome = build_game_over_chrome(viewport.chrome_scale)
+    ball_sprites = BallSprites(scale=viewport.scene_scale)
 
 
 def map_to_ui(x, y, cam_width, cam_height):
@@ -377,337 +1798,1859 @@ def map_to_ui(x, y, cam_width, cam_height):
     return np.clip(ui_x, 0, UI_WIDTH - 1), np.clip(ui_y, 0, UI_HEIGHT - 1)
 
 
-def get_palm_center(hand_landmarks, cam_width, cam_height):
-    """Get palm center position (average of wrist and base knuckles)"""
-    # Use landmarks 0 (wrist), 5, 9, 13, 17 (base of each finger)
-    palm_points = [0, 5, 9, 13, 17]
-    x_sum = 0
-    y_sum = 0
+def hand_features(points, cam_width, cam_height):
+    """Vectorized features of an (n_hands, 21, 3) landmark array, all hands in one pass"""
+    points = points.astype(np.float64)
+    # Camera pixels, truncated like the original per-landmark int() conversion
+    px = (points[..., :2] * (cam_width, cam_height)).astype(np.int32).astype(np.float64)
+    tips = px[:, FINGERTIPS]
+    tip_distances = np.linalg.norm(tips[:, :, None] - tips[:, None, :], axis=-1)
+    
+    palm = points[:, PALM_POINTS, :2].mean(axis=1)
+    scale = np.linalg.norm(px[:, 9] - px[:, 0], axis=-1)  # Wrist to middle finger base
+    reach = (np.linalg.norm(px[:, FINGERTIPS] - px[:, CURL_BASE], axis=-1) /
+             np.maximum(np.linalg.norm(px[:, CURL_JOINT] - px[:, CURL_BASE], axis=-1), 1e-6))
+    curl = np.clip((CURL_STRAIGHT - reach) / (CURL_STRAIGHT - CURL_CURLED), 0, 1)
+    
+    vector = np.column_stack([curl, tip_distances[:, 0, 1],
+                              tip_distances[:, 1, 2] / np.maximum(scale, 1e-6)])
+    return {"px": px, "tip_distances": tip_distances, "palm": palm, "scale": scale,
+            "curl": curl, "vector": vector}
+
+
+def to_ui(x, y):
+    """Vectorized map_to_ui for arrays of normalized camera coordinates"""
+    ui_x = np.clip(((1 - x) * UI_WIDTH).astype(np.int32), 0, UI_WIDTH - 1)
+    ui_y = np.clip((y * UI_HEIGHT).astype(np.int32), 0, UI_HEIGHT - 1)
+    return ui_x, ui_y
+
+
+# Table-driven gesture classifier with hysteresis, evaluated for all hands and gestures at once
+class GestureClassifier:
+    def __init__(self, table=GESTURES):
+        self.names = list(table)
+        columns = list(GESTURE_FEATURES)
+        margins = np.array(list(GESTURE_FEATURES.values()), dtype=np.float64)
+        self.low = np.full((len(table), len(columns)), -np.inf)
+        self.high = np.full((len(table), len(columns)), np.inf)
+        for row, bounds in enumerate(table.values()):
+            for feature, (low, high) in bounds.items():
+                col = columns.index(feature)
+                if low is not None:
+                    self.low[row, col] = low
+                if high is not None:
+                    self.high[row, col] = high
+        # Active gestures only end once a feature leaves the widened bounds
+        self.exit_low = self.low - margins
+        self.exit_high = self.high + margins
+        self.reset()
+    
+    def reset(self):
+        self.active = np.zeros((0, len(self.names)), dtype=bool)
+        self.drag_origin = np.zeros((0, 2))
+        self.dragging = np.zeros(0, dtype=bool)
+        self.scroll_prev = np.zeros((0, 2))
+        self.scroll = np.zeros(0)  # Vertical scroll this frame, UI pixels
     
-    for idx in palm_points:
-        landmark = hand_landmarks.landmark[idx]
-        x_sum += landmark.x
-        y_sum += landmark.y
+    def index(self, name):
+        return self.names.index(name)
     
-    avg_x = x_sum / len(palm_points)
-    avg_y = y_sum / len(palm_points)
+    def update(self, features, cursors):
+        """Classify every hand; cursors are the (n_hands, 2) index fingertips in UI pixels"""
+        vector = features["vector"][:, None, :]
+        entered = ((vector >= self.low) & (vector <= self.high)).all(axis=2)
+        held = ((vector >= self.exit_low) & (vector <= self.exit_high)).all(axis=2)
+        n = len(vector)
+        if len(self.active) != n:
+            self.reset()
+            self.active = np.zeros((n, len(self.names)), dtype=bool)
+            self.drag_origin = cursors.astype(np.float64)
+            self.dragging = np.zeros(n, dtype=bool)
+            self.scroll_prev = cursors.astype(np.float64)
+            self.scroll = np.zeros(n)
+        was_pinching = self.active[:, self.index("pinch")]
+        self.active = np.where(self.active, held, entered)
+        
+        # Pinch-drag: a held pinch that has moved far enough from where it started
+        pinching = self.active[:, self.index("pinch")]
+        started = pinching & ~was_pinching
+        self.drag_origin[started] = cursors[started]
+        moved = np.linalg.norm(cursors - self.drag_origin, axis=1) > DRAG_THRESHOLD
+        self.dragging = pinching & (self.dragging | moved)
+        
+        # Two-finger scroll: vertical motion of the hand while the gesture is held
+        scrolling = self.active[:, self.index("scroll")]
+        self.scroll = np.where(scrolling, cursors[:, 1] - self.scroll_prev[:, 1], 0)
+        self.scroll_prev = cursors.astype(np.float64)
+        return self.active
     
-    return map_to_ui(avg_x, avg_y, cam_width, cam_height)
+    def label(self, hand=0):
+        """Name of the first active gesture of a hand in table order, drag overrides pinch"""
+        if hand >= len(self.active):
+            return "none"
+        if self.dragging[hand]:
+            return "drag"
+        for name, on in zip(self.names, self.active[hand]):
+            if on:
+                return name
+        return "none"
 
 
-def draw_game_ui(frame, cursor_pos, fps, cam_frame, hand_landmarks_list):
-    """Draw the game UI"""
-    # Background - camera or dark
-    if state.show_camera_bg and cam_frame is not None:
-        # Resize camera frame to UI size
-        bg = cv2.resize(cam_frame, (UI_WIDTH, UI_HEIGHT))
-        # Flip horizontally for mirror effect
-        bg = cv2.flip(bg, 1)
-        # Darken slightly for better visibility of game elements
-        bg = cv2.addWeighted(bg, 0.6, np.zeros_like(bg), 0.4, 0)
-        frame[:] = bg
+gestures = GestureClassifier()
+
+
+def draw_background(frame, cam_frame, brightness, fill_color):
+    """Mirrored, darkened camera frame, or a solid fill when the camera BG is off"""
+    start = profiler.mark()
+    if state.show_camera_bg and quality.allows("camera_bg") and cam_frame is not None:
+        # Mirror and darken at camera resolution, then one resize pass straight into the frame
+        bg = frame_pool.get("background", cam_frame.shape)
+        cv2.flip(cam_frame, 1, bg)
+        cv2.convertScaleAbs(bg, bg, brightness)
+        cv2.resize(bg, (frame.shape[1], frame.shape[0]), frame)
     else:
-        frame[:] = (20, 20, 20)
+        np.copyto(frame, frame_pool.filled(fill_color, frame.shape))
+    profiler.add("background", start)
+
+
+def draw_hand_skeleton(frame, hand_points):
+    """Bones and joints of all hands, mirrored into the frame with one polylines call each"""
+    start = profiler.mark()
+    if state.show_hand_landmarks and quality.allows("landmarks") and len(hand_points):
+        s = viewport.scene_scale
+        # Same mirror mapping as to_ui(), in fixed point at the scene resolution
+        unit = (1 << SKELETON_SHIFT) * s
+        pts = np.empty((len(hand_points), 21, 2), np.int32)
+        pts[..., 0] = np.rint((1 - hand_points[..., 0]) * (UI_WIDTH * unit))
+        pts[..., 1] = np.rint(hand_points[..., 1] * (UI_HEIGHT * unit))
+        bones = [hand[bone] for hand in pts for bone in HAND_BONES]
+        cv2.polylines(frame, bones, False, COLOR_BONE, scaled_thickness(BONE_THICKNESS, s),
+                      shift=SKELETON_SHIFT)
+        # A line from a point to itself is a round dot as wide as the line, so all joints are one call too
+        joints = np.repeat(pts.reshape(-1, 1, 2), 2, axis=1)
+        cv2.polylines(frame, joints, False, COLOR_JOINT, 2 * max(1, scaled(JOINT_RADIUS, s)),
+                      shift=SKELETON_SHIFT)
+    profiler.add("landmarks", start)
+
+
+def draw_game_ui(frame, cursor_pos, fps, cam_frame, hand_points):
+    """Draw the game UI"""
+    # Background - camera or dark, darken slightly for better visibility of game elements
+    draw_background(frame, cam_frame, 0.6, (20, 20, 20))
+    draw_hand_skeleton(frame, hand_points)
 
     # Draw all balls
-    for ball in game.balls:
-        ball.draw(frame)
+    s = viewport.scene_scale
+    game.balls.draw(frame, game.alpha, s)
 
     # Draw bar if two hands detected
-    if game.bar_pos:
-        x1, y1, x2, y2 = game.bar_pos
+    if game.display_bar:
+        p1 = (scaled(game.display_bar[0], s), scaled(game.display_bar[1], s))
+        p2 = (scaled(game.display_bar[2], s), scaled(game.display_bar[3], s))
         # Draw bar with gradient effect
-        cv2.line(frame, (x1, y1), (x2, y2), (0, 255, 255), BAR_THICKNESS)
-        cv2.line(frame, (x1, y1), (x2, y2), (255, 255, 255), 3)
+        cv2.line(frame, p1, p2, (0, 255, 255), scaled_thickness(BAR_THICKNESS, s))
+        cv2.line(frame, p1, p2, (255, 255, 255), scaled_thickness(3, s))
         # Draw palm indicators
-        cv2.circle(frame, (x1, y1), 15, (0, 200, 255), -1)
-        cv2.circle(frame, (x2, y2), 15, (0, 200, 255), -1)
+        cv2.circle(frame, p1, scaled(15, s), (0, 200, 255), -1)
+        cv2.circle(frame, p2, scaled(15, s), (0, 200, 255), -1)
 
     # Draw game HUD
     time_remaining = game.get_time_remaining()
+    combo_color = (0, 255, 255) if game.combo > 0 else (100, 100, 100)
+    time_color = (0, 255, 0) if time_remaining > 10 else (0, 0, 255)
+    balls_left = game.total_balls - game.balls_spawned + len(game.balls)
+    
+    hud_chrome.set_state("score", (f"SCORE: {game.score}", (0, 255, 0)))
+    hud_chrome.set_state("combo", (f"COMBO: {game.combo}x", combo_color))
+    hud_chrome.set_state("time", (f"TIME: {int(time_remaining)}s", time_color))
+    hud_chrome.set_state("balls", (f"BALLS: {balls_left}", (255, 200, 0)))
+    hud_chrome.set_visible("instruction", not game.display_bar)
+    viewport.overlay(frame, hud_chrome.composite)
 
-    # Top bar with stats
-    overlay = frame.copy()
-    cv2.rectangle(overlay, (0, 0), (UI_WIDTH, 80), (40, 40, 40), -1)
-    cv2.addWeighted(overlay, 0.7, frame, 0.3, 0, frame)
 
-    # Score
-    cv2.putText(frame, f"SCORE: {game.score}", (20, 50),
-                cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 255, 0), 3)
+def draw_game_over_ui(frame):
+    """Draw game over screen"""
+    game_over_chrome.set_state("final_score", (f"Final Score: {game.score}", (0, 255, 0)))
+    game_over_chrome.set_state("max_combo", (f"Max Combo: {game.max_combo}x", (0, 255, 255)))
+    viewport.overlay(frame, game_over_chrome.composite)
+    return game_over_buttons
 
-    # Combo
-    combo_color = (0, 255, 255) if game.combo > 0 else (100, 100, 100)
-    cv2.putText(frame, f"COMBO: {game.combo}x", (350, 50),
-                cv2.FONT_HERSHEY_SIMPLEX, 1.2, combo_color, 3)
 
-    # Time
-    time_color = (0, 255, 0) if time_remaining > 10 else (0, 0, 255)
-    cv2.putText(frame, f"TIME: {int(time_remaining)}s", (700, 50),
-                cv2.FONT_HERSHEY_SIMPLEX, 1.2, time_color, 3)
+def draw_ui(frame, cursor_pos, pinch_detected, pinch_distance, fps, cam_frame, hand_points):
+    """Draw the complete UI"""
+    # Background - camera or solid color, darken for better UI visibility
+    draw_background(frame, cam_frame, 0.5, COLOR_BG)
+    draw_hand_skeleton(frame, hand_points)
+    
+    # Display typed text (truncate if too long)
+    display_text = state.typed_text[-60:] if len(state.typed_text) > 60 else state.typed_text
+    main_chrome.set_state("typed_text", (display_text, COLOR_TEXT))
+    
+    # Virtual keyboard (if visible)
+    for kb_btn in keyboard_buttons:
+        main_chrome.set_visible(kb_btn, state.keyboard_visible)
+    suggestions = state.suggestions() if state.keyboard_visible else []
+    for i, btn in enumerate(suggestion_buttons):
+        btn.label = suggestions[i] if i < len(suggestions) else ""
+        main_chrome.set_visible(btn, bool(btn.label))
+    
+    # Status bar
+    status_text = f"FPS: {fps:.1f} | Pinch: {'YES' if pinch_detected else 'NO'} ({pinch_distance:.1f}px)"
+    if state.keyboard_visible:
+        status_text += " | KB: ON"
+    status_text += f" | CamBG: {'ON' if state.show_camera_bg else 'OFF'}"
+    status_text += f" | Hands: {'ON' if state.show_hand_landmarks else 'OFF'}"
+    status_text += f" | Gesture: {gestures.label()}"
+    status_text += f" | Quality: {quality.label()}"
+    if latency.samples:
+        status_text += f" | Latency: {latency.percentiles()[0]:.0f} ms"
+    if hand_model.loading:
+        status_text += " | Loading hand model..."
+    main_chrome.set_state("status", (status_text, COLOR_TEXT))
+    
+    notice = dispatcher.poll()
+    if notice is not None:
+        main_chrome.set_state("notice", notice)
+    main_chrome.set_visible("notice", notice is not None)
+    
+    viewport.overlay(frame, main_chrome.composite)
 
-    # Balls remaining
-    balls_left = TOTAL_BALLS - game.balls_spawned + len(game.balls)
-    cv2.putText(frame, f"BALLS: {balls_left}", (1000, 50),
-                cv2.FONT_HERSHEY_SIMPLEX, 1.2, (255, 200, 0), 3)
 
-    # Instructions if no bar detected
-    if not game.bar_pos:
-        cv2.putText(frame, "SHOW BOTH HANDS TO CREATE BAR!",
-                    (UI_WIDTH//2 - 300, UI_HEIGHT//2),
-                    cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 0, 255), 2)
+# Frame sources: read() returns (cam_frame, capture_time, results) or None at the end,
+# results is None when hand inference still has to run. reuse=True lets a source
+# overwrite the previous frame, for loops that are done with it before the next read.
+class CameraSource:
+    def __init__(self, cap):
+        self.cap = cap
+        self.frame = None
+    
+    def read(self, reuse=False):
+        ret, cam_frame = self.cap.read(self.frame if reuse else None)
+        if not ret:
+            return None
+        if reuse:
+            self.frame = cam_frame
+        return cam_frame, time.time(), None
+    
+    def release(self):
+        self.cap.release()
 
 
-def draw_game_over_ui(frame):
-    """Draw game over screen"""
-    # Semi-transparent overlay
-    overlay = frame.copy()
-    cv2.rectangle(overlay, (0, 0), (UI_WIDTH, UI_HEIGHT), (0, 0, 0), -1)
-    cv2.addWeighted(overlay, 0.7, frame, 0.3, 0, frame)
+class GrabberSource:
+    """Low-latency capture: a grabber thread keeps the driver queue empty and only the newest frame
+    
+    Every frame is grab()bed as soon as the driver has it and stamped right then, retrieve()
+    decodes it into a pooled buffer that replaces the previous unread frame. Video files are
+    grabbed at their frame rate, standing in for a camera.
+    """
+    def __init__(self, cap, fps=0):
+        self.cap = cap
+        self.fps = fps  # Pace grabbing to this rate, 0 = as the driver delivers
+        self.cond = threading.Condition()
+        self.newest = None  # (frame, capture_time) not yet read
+        self.free = deque()  # Buffers handed back by read(reuse=True)
+        self.last = None
+        self.closed = False
+        self.ended = False
+        self.grabbed = 0
+        self.stale = 0  # Frames replaced by a newer one before the loop read them
+        self.thread = threading.Thread(target=self.run, name="grabber", daemon=True)
+        self.thread.start()
+    
+    def run(self):
+        start = time.perf_counter()
+        while not self.closed:
+            if self.fps:
+                delay = start + self.grabbed / self.fps - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            if not self.cap.grab():
+                break
+            capture_time = time.time()
+            self.grabbed += 1
+            with self.cond:
+                target = self.free.popleft() if self.free else None
+            ok, frame = self.cap.retrieve(target)
+            if not ok:
+                break
+            with self.cond:
+                if self.newest is not None:
+                    self.stale += 1
+                    self.free.append(self.newest[0])
+                self.newest = (frame, capture_time)
+                self.cond.notify_all()
+        with self.cond:
+            self.ended = True
+            self.cond.notify_all()
+    
+    def read(self, reuse=False):
+        """Wait for a frame newer than the last one read"""
+        with self.cond:
+            if self.last is not None:
+                self.free.append(self.last)
+                self.last = None
+            while self.newest is None and not self.ended:
+                self.cond.wait()
+            if self.newest is None:
+                return None
+            (cam_frame, capture_time), self.newest = self.newest, None
+            if reuse:
+                self.last = cam_frame  # Refilled by the grabber once the next read comes in
+        return cam_frame, capture_time, None
+    
+    def release(self):
+        self.closed = True
+        self.thread.join(timeout=1.0)
+        self.cap.release()
 
-    # Game Over text
-    cv2.putText(frame, "GAME OVER!", (UI_WIDTH//2 - 200, 150),
-                cv2.FONT_HERSHEY_SIMPLEX, 2.0, (0, 0, 255), 4)
 
-    # Stats
-    y_offset = 280
-    cv2.putText(frame, f"Final Score: {game.score}", (UI_WIDTH//2 - 150, y_offset),
-                cv2.FONT_HERSHEY_SIMPLEX, 1.5, (0, 255, 0), 3)
+# Capture-to-display latency of the presented frames, from the capture timestamps they carry
+class LatencyMeter:
+    def __init__(self, window=LATENCY_WINDOW):
+        self.enabled = True
+        self.samples = deque(maxlen=window)
+    
+    def add(self, capture_time):
+        if self.enabled and capture_time is not None:
+            self.samples.append(time.time() - capture_time)
+    
+    def percentiles(self):
+        """(p50, p95) in ms over the window, None before the first frame"""
+        if not self.samples:
+            return None
+        return tuple(np.percentile(self.samples, (50, 95)) * 1000)
 
-    cv2.putText(frame, f"Max Combo: {game.max_combo}x", (UI_WIDTH//2 - 150, y_offset + 80),
-                cv2.FONT_HERSHEY_SIMPLEX, 1.5, (0, 255, 255), 3)
 
-    # Buttons
-    play_again_btn = Button(UI_WIDTH//2 - 250, 450, 200, 60, "Play Again", game.start_game)
-    exit_btn = Button(UI_WIDTH//2 + 50, 450, 200, 60, "Exit to Menu", game.reset_game)
+latency = LatencyMeter()
 
-    play_again_btn.draw(frame)
-    exit_btn.draw(frame)
 
-    return [play_again_btn, exit_btn]
+def landmarks_array(results):
+    """Hand landmarks of a result as an (n_hands, 21, 3) float32 array"""
+    if isinstance(results, ReplayResults):
+        return results.landmarks
+    if results is None or not results.multi_hand_landmarks:
+        return np.zeros((0, 21, 3), dtype=np.float32)
+    return np.array([[(lm.x, lm.y, lm.z) for lm in hand_landmarks.landmark]
+                     for hand_landmarks in results.multi_hand_landmarks], dtype=np.float32)
 
 
-def draw_ui(frame, cursor_pos, pinch_detected, pinch_distance, fps, cam_frame, hand_landmarks_list):
-    """Draw the complete UI"""
-    # Background - camera or solid color
-    if state.show_camera_bg and cam_frame is not None:
-        # Resize camera frame to UI size
-        bg = cv2.resize(cam_frame, (UI_WIDTH, UI_HEIGHT))
-        # Flip horizontally for mirror effect
-        bg = cv2.flip(bg, 1)
-        # Darken for better UI visibility
-        bg = cv2.addWeighted(bg, 0.5, np.zeros_like(bg), 0.5, 0)
-        frame[:] = bg
-    else:
-        frame[:] = COLOR_BG
+def handedness_array(results):
+    """Index into HANDEDNESS per hand as an int8 array, -1 where MediaPipe gives no label"""
+    if isinstance(results, ReplayResults):
+        return results.handedness
+    if results is None or not results.multi_hand_landmarks:
+        return np.zeros(0, dtype=np.int8)
+    if not getattr(results, "multi_handedness", None):
+        return np.full(len(results.multi_hand_landmarks), -1, dtype=np.int8)
+    return np.array([HANDEDNESS.index(hand.classification[0].label) for hand in results.multi_handedness],
+                    dtype=np.int8)
+
+
+# Landmark arrays (replay, filtered stream, tracking sources) in place of MediaPipe results,
+# read through landmarks_array() and handedness_array()
+class ReplayResults:
+    def __init__(self, landmarks, handedness=None):
+        self.landmarks = landmarks
+        self.handedness = np.full(len(landmarks), -1, dtype=np.int8) if handedness is None else handedness
+
+
+# Session file: header, one chunk per frame, index of chunk offsets, trailer
+#   chunk = header + landmarks (n_hands x 21 x 3 float32) + handedness (n_hands int8) + raw BGR or JPEG frame
+SESSION_MAGIC = b"HUISESS3"
+SESSION_HEADER = struct.Struct("<8sq")  # magic, game seed (-1 when unknown)
+SESSION_MAGIC_V1 = b"HUISESS1"  # Older files, still readable: v1 has no handedness, neither has a seed
+SESSION_MAGIC_V2 = b"HUISESS2"
+SESSION_INDEX_MAGIC = b"HUIINDEX"
+SESSION_CHUNK = struct.Struct("<IdBBHHI")  # index, capture time, encoding, hands, height, width, size
+SESSION_TRAILER = struct.Struct("<QQ8s")  # index offset, chunk count, magic
+SESSION_ENCODINGS = {"raw": 0, "jpeg": 1}
+
+
+class SessionWriter:
+    def __init__(self, path, encoding=SESSION_ENCODING, jpeg_quality=SESSION_JPEG_QUALITY, seed=None):
+        self.file = open(path, "wb")
+        self.file.write(SESSION_HEADER.pack(SESSION_MAGIC, -1 if seed is None else seed))
+        self.encoding = SESSION_ENCODINGS[encoding]
+        self.jpeg_quality = jpeg_quality
+        self.offsets = []
     
-    # Title bar with semi-transparent background
-    overlay = frame.copy()
-    cv2.rectangle(overlay, (0, 0), (UI_WIDTH, 80), (60, 60, 60), -1)
-    cv2.addWeighted(overlay, 0.8, frame, 0.2, 0, frame)
+    def write(self, cam_frame, capture_time, results):
+        """Append one frame with its capture time, hand landmarks and handedness"""
+        landmarks = landmarks_array(results)
+        handedness = handedness_array(results)
+        if self.encoding == SESSION_ENCODINGS["jpeg"]:
+            ok, payload = cv2.imencode(".jpg", cam_frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        else:
+            payload = np.ascontiguousarray(cam_frame)
+        height, width = cam_frame.shape[:2]
+        self.offsets.append(self.file.tell())
+        self.file.write(SESSION_CHUNK.pack(len(self.offsets) - 1, capture_time, self.encoding,
+                                           len(landmarks), height, width, payload.nbytes))
+        self.file.write(landmarks.tobytes())
+        self.file.write(handedness.tobytes())
+        self.file.write(payload.tobytes())
     
-    cv2.putText(frame, "HAND-CONTROLLED DESKTOP UI", (20, 50),
-               cv2.FONT_HERSHEY_SIMPLEX, 1.2, COLOR_TEXT, 2)
+    def close(self):
+        """Write the chunk index so readers can open the file without scanning it"""
+        index_offset = self.file.tell()
+        self.file.write(np.array(self.offsets, dtype="<u8").tobytes())
+        self.file.write(SESSION_TRAILER.pack(index_offset, len(self.offsets), SESSION_INDEX_MAGIC))
+        self.file.close()
+
+
+class SessionReader:
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic = self.mm[:len(SESSION_MAGIC)]
+        if magic == SESSION_MAGIC:
+            _, seed = SESSION_HEADER.unpack_from(self.mm, 0)
+            self.seed = None if seed < 0 else seed  # Game seed of the recorded run
+            self.data_start = SESSION_HEADER.size
+        elif magic in (SESSION_MAGIC_V1, SESSION_MAGIC_V2):
+            self.seed = None
+            self.data_start = len(magic)
+        else:
+            raise ValueError(f"{path} is not a session file")
+        self.handedness_size = 0 if magic == SESSION_MAGIC_V1 else 1  # Bytes per hand
+        self.offsets = self.read_index()
     
-    # Main buttons
-    for btn in buttons:
-        btn.draw(frame)
+    def read_index(self):
+        """Chunk offsets from the trailer, or by walking the chunks of an unfinished file"""
+        size = len(self.mm)
+        if size >= self.data_start + SESSION_TRAILER.size:
+            index_offset, count, magic = SESSION_TRAILER.unpack_from(self.mm, size - SESSION_TRAILER.size)
+            if magic == SESSION_INDEX_MAGIC:
+                return np.frombuffer(self.mm, dtype="<u8", count=count, offset=index_offset).tolist()
+        offsets = []
+        offset = self.data_start
+        while offset + SESSION_CHUNK.size <= size:
+            _, _, _, n_hands, _, _, payload_size = SESSION_CHUNK.unpack_from(self.mm, offset)
+            end = offset + SESSION_CHUNK.size + n_hands * (21 * 3 * 4 + self.handedness_size) + payload_size
+            if end > size:
+                break  # Truncated last chunk
+            offsets.append(offset)
+            offset = end
+        return offsets
     
-    # Text input display
-    input_y = button_y + BUTTON_HEIGHT + BUTTON_MARGIN
-    overlay = frame.copy()
-    cv2.rectangle(overlay, (BUTTON_MARGIN, input_y),
-                 (UI_WIDTH - BUTTON_MARGIN, input_y + 60), (60, 60, 60), -1)
-    cv2.addWeighted(overlay, 0.8, frame, 0.2, 0, frame)
-    cv2.rectangle(frame, (BUTTON_MARGIN, input_y),
-                 (UI_WIDTH - BUTTON_MARGIN, input_y + 60), (150, 150, 150), 2)
+    def __len__(self):
+        return len(self.offsets)
     
-    cv2.putText(frame, "Text Input:", (BUTTON_MARGIN + 10, input_y + 25),
-               cv2.FONT_HERSHEY_SIMPLEX, 0.6, (180, 180, 180), 1)
+    def read(self, i):
+        """(capture_time, cam_frame, landmarks, handedness) of chunk i"""
+        offset = self.offsets[i]
+        (_, capture_time, encoding, n_hands, height, width,
+         payload_size) = SESSION_CHUNK.unpack_from(self.mm, offset)
+        offset += SESSION_CHUNK.size
+        landmarks = np.frombuffer(self.mm, dtype=np.float32, count=n_hands * 21 * 3,
+                                  offset=offset).reshape(n_hands, 21, 3).copy()
+        offset += landmarks.nbytes
+        if self.handedness_size:
+            handedness = np.frombuffer(self.mm, dtype=np.int8, count=n_hands, offset=offset).copy()
+            offset += n_hands
+        else:
+            handedness = np.full(n_hands, -1, dtype=np.int8)
+        payload = np.frombuffer(self.mm, dtype=np.uint8, count=payload_size, offset=offset)
+        if encoding == SESSION_ENCODINGS["jpeg"]:
+            cam_frame = cv2.imdecode(payload, cv2.IMREAD_COLOR)
+        else:
+            cam_frame = payload.reshape(height, width, 3).copy()
+        del payload
+        return capture_time, cam_frame, landmarks, handedness
     
-    # Display typed text (truncate if too long)
-    display_text = state.typed_text[-60:] if len(state.typed_text) > 60 else state.typed_text
-    cv2.putText(frame, display_text, (BUTTON_MARGIN + 10, input_y + 50),
-               cv2.FONT_HERSHEY_SIMPLEX, 0.7, COLOR_TEXT, 2)
+    def close(self):
+        self.mm.close()
+        self.file.close()
+
+
+class ReplaySource:
+    """Frames and landmarks from a session file, in real time or as fast as possible"""
+    def __init__(self, path, realtime=True):
+        self.reader = SessionReader(path)
+        self.realtime = realtime
+        self.index = 0
+        self.start = None  # (wall clock, capture time) of the first frame
     
-    # Virtual keyboard (if visible)
-    if state.keyboard_visible:
-        kb_buttons = create_keyboard_buttons()
-        for kb_btn in kb_buttons:
-            kb_btn.is_hovered = kb_btn.contains(cursor_pos[0], cursor_pos[1]) if cursor_pos else False
-            kb_btn.draw(frame)
+    def read(self, reuse=False):
+        if self.index >= len(self.reader):
+            return None
+        capture_time, cam_frame, landmarks, handedness = self.reader.read(self.index)
+        self.index += 1
+        if self.realtime:
+            if self.start is None:
+                self.start = (time.perf_counter(), capture_time)
+            delay = (capture_time - self.start[1]) - (time.perf_counter() - self.start[0])
+            if delay > 0:
+                time.sleep(delay)
+        return cam_frame, capture_time, ReplayResults(landmarks, handedness)
     
-    # Status bar
-    status_y = UI_HEIGHT - 40
-    overlay = frame.copy()
-    cv2.rectangle(overlay, (0, status_y), (UI_WIDTH, UI_HEIGHT), (50, 50, 50), -1)
-    cv2.addWeighted(overlay, 0.8, frame, 0.2, 0, frame)
+    def release(self):
+        self.reader.close()
+
+
+# Hand inference front end: crops to the last known hands, full frame when tracking is lost
+class HandInference:
+    def __init__(self, roi=ROI_ENABLED, max_side=INFERENCE_MAX_SIDE):
+        self.roi = roi
+        self.max_side = max_side
+        self.last_box = None  # Normalized (x1, y1, x2, y2) around the hands of the last frame
+        self.frames_since_full = 0
+        self.last_crop = None  # Pixel (x1, y1, x2, y2) used for the last frame
     
-    status_text = f"FPS: {fps:.1f} | Pinch: {'YES' if pinch_detected else 'NO'} ({pinch_distance:.1f}px)"
-    if state.keyboard_visible:
-        status_text += " | KB: ON"
-    status_text += f" | CamBG: {'ON' if state.show_camera_bg else 'OFF'}"
-    status_text += f" | Hands: {'ON' if state.show_hand_landmarks else 'OFF'}"
+    def crop_for(self, width, height):
+        """Padded pixel crop around the last hands, or None for full-frame detection"""
+        if not self.roi or self.last_box is None or self.frames_since_full >= ROI_REDETECT_INTERVAL:
+            return None
+        x1, y1, x2, y2 = self.last_box
+        cx, cy = (x1 + x2) / 2 * width, (y1 + y2) / 2 * height
+        side = max((x2 - x1) * width, (y2 - y1) * height) * (1 + 2 * ROI_PADDING)
+        side = max(side, ROI_MIN_SIZE * min(width, height))
+        left, right = int(max(0, cx - side / 2)), int(min(width, cx + side / 2))
+        top, bottom = int(max(0, cy - side / 2)), int(min(height, cy + side / 2))
+        if (right - left) * (bottom - top) > ROI_MAX_AREA * width * height:
+            return None
+        return left, top, right, bottom
+    
+    def process(self, cam_frame):
+        """MediaPipe results with landmarks in full-frame normalized coordinates"""
+        height, width = cam_frame.shape[:2]
+        crop = self.crop_for(width, height)
+        if crop is None:
+            crop = (0, 0, width, height)
+            self.frames_since_full = 0
+        else:
+            self.frames_since_full += 1
+        self.last_crop = crop
+        left, top, right, bottom = crop
+        
+        start = profiler.mark()
+        image = cam_frame[top:bottom, left:right]
+        scale = 1.0
+        if self.max_side and max(image.shape[:2]) > self.max_side:
+            scale = self.max_side / max(image.shape[:2])
+            size = (round(image.shape[1] * scale), round(image.shape[0] * scale))
+            scaled = frame_pool.get("inference_scaled", (size[1], size[0], 3))
+            image = cv2.resize(image, size, scaled, interpolation=cv2.INTER_AREA)
+        # Pooled buffer, only reallocated when the crop size changes
+        image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB, frame_pool.get("inference", image.shape))
+        profiler.add("convert", start)
+        
+        start = profiler.mark()
+        results = hand_model.process(image_rgb)
+        profiler.add("inference", start)
+        
+        if not results.multi_hand_landmarks:
+            self.last_box = None  # Tracking lost, next frame detects on the full frame
+            return results
+        
+        # Map crop-normalized landmarks back to full-frame normalized coordinates
+        crop_w, crop_h = right - left, bottom - top
+        if crop != (0, 0, width, height):
+            sx, sy = crop_w / width, crop_h / height
+            ox, oy = left / width, top / height
+            for hand_landmarks in results.multi_hand_landmarks:
+                for lm in hand_landmarks.landmark:
+                    lm.x = ox + lm.x * sx
+                    lm.y = oy + lm.y * sy
+                    lm.z = lm.z * sx
+        
+        points = landmarks_array(results)
+        self.last_box = (*points[..., :2].min(axis=(0, 1)).tolist(),
+                         *points[..., :2].max(axis=(0, 1)).tolist())
+        return results
+
+
+hand_inference = HandInference()
+
+
+# Vectorized One-Euro filter over all landmarks, with constant-velocity prediction
+class LandmarkFilter:
+    def __init__(self, smoothing=FILTER_ENABLED):
+        self.smoothing = smoothing
+        self.reset()
+    
+    def reset(self):
+        self.value = None  # Filtered (n_hands, 21, 3) landmarks
+        self.handedness = None
+        self.speed = None  # Filtered derivative, normalized units per second
+        self.time = 0.0
+    
+    @staticmethod
+    def alpha(dt, cutoff):
+        r = 2 * np.pi * cutoff * dt
+        return r / (r + 1)
     
-    cv2.putText(frame, status_text, (20, status_y + 25),
-               cv2.FONT_HERSHEY_SIMPLEX, 0.6, COLOR_TEXT, 1)
+    def update(self, points, now, handedness):
+        """Filter newly inferred landmarks taken at time now"""
+        if self.value is None or self.value.shape != points.shape:
+            self.value = points.copy()
+            self.speed = np.zeros_like(points)
+            self.handedness = handedness
+            self.time = now
+            return self.value
+        
+        # Keep each hand on the same slot when MediaPipe swaps their order
+        if len(points) == 2:
+            same = np.abs(points[:, 0, :2] - self.value[:, 0, :2]).sum()
+            swapped = np.abs(points[::-1, 0, :2] - self.value[:, 0, :2]).sum()
+            if swapped < same:
+                points = points[::-1]
+                handedness = handedness[::-1]
+        self.handedness = handedness
+        
+        dt = max(now - self.time, 1e-3)
+        self.speed += self.alpha(dt, FILTER_D_CUTOFF) * ((points - self.value) / dt - self.speed)
+        if self.smoothing:
+            cutoff = FILTER_MIN_CUTOFF + FILTER_BETA * np.abs(self.speed)
+            self.value += self.alpha(dt, cutoff) * (points - self.value)
+        else:
+            self.value[:] = points
+        self.time = now
+        return self.value
+    
+    def predict(self, now):
+        """Landmarks extrapolated to time now from the filtered position and speed"""
+        dt = min(max(now - self.time, 0.0), FILTER_MAX_PREDICT)
+        return self.value + self.speed * dt
 
 
-def main():
-    """Main application loop"""
-    cap = cv2.VideoCapture(0)
+# Hand landmark stream: inference every Nth frame (or adaptively), filtered and predicted in between
+class HandStream:
+    def __init__(self, interval=INFERENCE_INTERVAL, adaptive=INFERENCE_ADAPTIVE):
+        self.interval = interval
+        self.adaptive = adaptive
+        self.filter = LandmarkFilter()
+        self.skipped = 0  # Frames predicted since the last inference
+        self.inferred = 0
+        self.predicted = 0
+    
+    def inference_due(self, now):
+        if self.adaptive:
+            if self.filter.value is not None:
+                drift = np.abs(self.filter.speed[..., :2]).max() * (now - self.filter.time)
+                if drift > ADAPTIVE_MAX_DRIFT:
+                    return True
+            return self.skipped + 1 >= ADAPTIVE_MAX_INTERVAL
+        return self.skipped + 1 >= self.interval
+    
+    def process(self, cam_frame, capture_time):
+        """Filtered results for this frame, running MediaPipe only when due"""
+        if hand_model.loading:
+            return ReplayResults(np.zeros((0, 21, 3), dtype=np.float32))
+        if self.inferred == 0 or self.inference_due(capture_time):
+            self.skipped = 0
+            self.inferred += 1
+            results = hand_inference.process(cam_frame)
+            points = landmarks_array(results)
+            if len(points) == 0:
+                self.filter.reset()
+                return ReplayResults(points)
+            points = self.filter.update(points, capture_time, handedness_array(results))
+            # The filter keeps updating its array in place, results get their own copy
+            return ReplayResults(points.copy(), self.filter.handedness)
+        
+        self.skipped += 1
+        self.predicted += 1
+        if self.filter.value is None:
+            return ReplayResults(np.zeros((0, 21, 3), dtype=np.float32))
+        return ReplayResults(self.filter.predict(capture_time), self.filter.handedness)
+
+
+hand_stream = HandStream()
+
+
+# Frame-time governor: steps through QUALITY_STEPS to hold the budget, logs every change
+class QualityGovernor:
+    def __init__(self, budget_ms=GOVERNOR_BUDGET_MS, enabled=GOVERNOR_ENABLED):
+        self.enabled = enabled
+        self.budget = budget_ms / 1000
+        self.steps = [name for name, _ in QUALITY_STEPS]
+        self.labels = dict(QUALITY_STEPS)
+        self.level = 0  # Steps dropped, from the start of the table
+        self.times = deque(maxlen=GOVERNOR_RESTORE_FRAMES)
+        self.start = None
+        self.changes = 0
+    
+    def allows(self, step):
+        """Whether a quality step is still on at the current level"""
+        return step not in self.steps or self.steps.index(step) >= self.level
+    
+    def remove_step(self, step):
+        """Never drop a step that has no effect in this run"""
+        self.steps.remove(step)
+    
+    def label(self):
+        return f"{len(self.steps) - self.level}/{len(self.steps)}"
+    
+    def begin_frame(self):
+        """Start timing a frame's work, once its input has arrived"""
+        self.start = time.perf_counter()
+    
+    def end_frame(self):
+        if not self.enabled or self.start is None:
+            return
+        self.times.append(time.perf_counter() - self.start)
+        self.start = None
+        recent = list(self.times)[-GOVERNOR_WINDOW:]
+        if len(recent) == GOVERNOR_WINDOW and sum(recent) / GOVERNOR_WINDOW > self.budget:
+            if self.level < len(self.steps):
+                self.set_level(self.level + 1, sum(recent) / GOVERNOR_WINDOW)
+        elif len(self.times) == self.times.maxlen and self.level > 0:
+            mean = sum(self.times) / len(self.times)
+            if mean < self.budget * GOVERNOR_HEADROOM:
+                self.set_level(self.level - 1, mean)
+    
+    def set_level(self, level, mean):
+        dropped = level > self.level
+        label = self.labels[self.steps[min(level, self.level)]]
+        self.level = level
+        self.times.clear()  # Judge the new level on its own frames
+        self.changes += 1
+        hand_inference.max_side = INFERENCE_MAX_SIDE if self.allows("inference") else GOVERNOR_INFERENCE_SIDE
+        print(f"Quality {self.label()}: {'dropped' if dropped else 'restored'} {label} "
+              f"(frames {mean * 1000:.1f} ms, budget {self.budget * 1000:.0f} ms)")
+
+
+quality = QualityGovernor()
+
+
+# Bounded queue between pipeline stages, consumed in order. With the default depth of 1 it
+# holds only the newest item; deeper queues absorb bursts at the cost of latency.
+class LatestQueue:
+    def __init__(self, maxsize=PIPELINE_QUEUE_DEPTH):
+        self.items = deque(maxlen=max(1, maxsize))
+        self.cond = threading.Condition()
+        self.dropped = 0
+        self.closed = False
+    
+    def put(self, item):
+        """Add an item, dropping the oldest one if the queue is full"""
+        with self.cond:
+            if len(self.items) == self.items.maxlen:
+                self.dropped += 1
+            self.items.append(item)
+            self.cond.notify_all()
+    
+    def get(self, timeout=None):
+        """Pop the oldest item, or None on timeout / close"""
+        with self.cond:
+            if not self.items and not self.closed and timeout != 0:
+                self.cond.wait(timeout)
+            if self.items:
+                return self.items.popleft()
+            return None
+    
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+
+def process_alive(pid):
+    """Whether a process with this pid exists (possibly owned by another user)"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+# Publishes landmarks and gesture events to other local apps (--publish-shm / --publish-socket)
+class TrackingPublisher:
+    def __init__(self):
+        self.shm = None
+        self.server = None
+        self.socket_path = None
+        self.socket_inode = None
+        self.clients = []  # [socket, unsent bytes] per connected reader
+        self.lock = threading.Lock()
+        self.outbox = LatestQueue(TRACKING_SLOTS)
+        self.threads = []
+        self.record = bytearray(TRACKING_RECORD_SIZE)
+        self.seq = 0
+        self.prev_pinch = False
+        self.dropped = 0  # Records skipped for socket readers that fell behind
     
+    @property
+    def active(self):
+        return self.shm is not None or self.server is not None
+    
+    def open_shm(self, name=TRACKING_SHM_NAME):
+        """Lock-free ring of the last TRACKING_SLOTS records, readers poll it"""
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True,
+                                                  size=TRACKING_RING_HEADER.size + TRACKING_SLOTS * TRACKING_RECORD_SIZE)
+        except FileExistsError:
+            # Only reclaim a ring left over from a run that did not shut down cleanly
+            existing = shared_memory.SharedMemory(name=name)
+            magic, _, _, owner, _ = (TRACKING_RING_HEADER.unpack_from(existing.buf, 0)
+                                     if existing.size >= TRACKING_RING_HEADER.size else (None,) * 5)
+            if magic == TRACKING_MAGIC and not process_alive(owner):
+                existing.close()
+                existing.unlink()
+                return self.open_shm(name)
+            # Attaching registered it with the resource tracker, which would unlink it at exit
+            resource_tracker.unregister(existing._name, "shared_memory")
+            existing.close()
+            if magic != TRACKING_MAGIC:
+                raise RuntimeError(f"Shared memory {name!r} exists and is not a tracking ring")
+            raise RuntimeError(f"Shared memory {name!r} is in use by process {owner}")
+        TRACKING_RING_HEADER.pack_into(self.shm.buf, 0, TRACKING_MAGIC, TRACKING_RECORD_SIZE, TRACKING_SLOTS,
+                                       os.getpid(), 0)
+    
+    def open_socket(self, path=TRACKING_SOCKET_PATH):
+        """Stream every record to the readers connected to a Unix domain socket"""
+        if os.path.lexists(path):
+            if not stat.S_ISSOCK(os.lstat(path).st_mode):
+                raise RuntimeError(f"{path!r} exists and is not a socket")
+            # Only reclaim a socket left over from a run that did not shut down cleanly
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                with contextlib.suppress(FileNotFoundError):
+                    os.unlink(path)
+            else:
+                raise RuntimeError(f"Socket {path!r} is in use by another publisher")
+            finally:
+                probe.close()
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(path)
+        self.server.listen()
+        self.server.settimeout(0.5)  # So the accept loop notices close()
+        self.socket_path = path
+        self.socket_inode = os.stat(path).st_ino  # To leave a socket alone that replaced ours
+        for target in (self.accept_worker, self.send_worker):
+            thread = threading.Thread(target=target, name=target.__name__, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+    
+    def publish(self, capture_time, results, cursor_pos, pinch_detected, pinch_distance, bar_pos):
+        """Write one frame of tracking, O(1) for the render loop whatever the number of readers"""
+        if not self.active:
+            return
+        flags = FLAG_PINCH if pinch_detected else 0
+        if pinch_detected and not self.prev_pinch:
+            flags |= FLAG_PINCH_DOWN
+        elif self.prev_pinch and not pinch_detected:
+            flags |= FLAG_PINCH_UP
+        if cursor_pos is not None:
+            flags |= FLAG_CURSOR
+        if bar_pos is not None:
+            flags |= FLAG_BAR
+        self.prev_pinch = pinch_detected
+        self.seq += 1
+        
+        args = (self.seq, capture_time or 0.0, landmarks_array(results), flags,
+                cursor_pos, bar_pos, pinch_distance)
+        if self.shm is not None:
+            offset = TRACKING_RING_HEADER.size + (self.seq % TRACKING_SLOTS) * TRACKING_RECORD_SIZE
+            encode_record(self.shm.buf, offset, *args)
+            # Readers look at the latest seq first, so it is bumped only once the slot is complete
+            struct.pack_into("<Q", self.shm.buf, TRACKING_RING_HEADER.size - 8, self.seq)
+        if self.server is not None and self.clients:
+            encode_record(self.record, 0, *args)
+            self.outbox.put(bytes(self.record))
+    
+    def accept_worker(self):
+        server = self.server
+        while self.server is not None:
+            try:
+                conn, _ = server.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                return  # Server socket closed
+            conn.sendall(TRACKING_HELLO.pack(TRACKING_MAGIC, TRACKING_RECORD_SIZE))
+            conn.setblocking(False)
+            with self.lock:
+                self.clients.append([conn, b""])
+    
+    def send_worker(self):
+        """Fan records out to the socket readers, a reader that can't keep up skips records"""
+        while self.server is not None:
+            record = self.outbox.get(timeout=0.5)
+            if record is None:
+                continue
+            with self.lock:
+                clients = list(self.clients)
+            for client in clients:
+                conn, unsent = client
+                try:
+                    if unsent:
+                        unsent = unsent[conn.send(unsent):]
+                    if unsent:
+                        self.dropped += 1
+                    else:
+                        unsent = record[conn.send(record):]
+                    client[1] = unsent
+                except BlockingIOError:
+                    self.dropped += 1
+                except OSError:
+                    conn.close()
+                    with self.lock:
+                        self.clients.remove(client)
+    
+    def close(self):
+        if self.server is not None:
+            server, self.server = self.server, None
+            server.close()
+            self.outbox.close()
+            for thread in self.threads:
+                thread.join(timeout=1.0)
+            with self.lock:
+                for conn, _ in self.clients:
+                    conn.close()
+                self.clients = []
+            with contextlib.suppress(FileNotFoundError):
+                if os.stat(self.socket_path).st_ino == self.socket_inode:
+                    os.unlink(self.socket_path)
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+
+publisher = TrackingPublisher()
+
+
+# Source ring: header, status, then one slot per frame
+#   slot = header + landmarks (TRACKING_MAX_HANDS x 21 x 3 float32) + BGR frame + trailing seq
+SOURCE_MAGIC = b"HUISRC01"
+SOURCE_RING_HEADER = struct.Struct("<8sIIII")  # magic, slots, height, width, slot size
+SOURCE_RING_STATUS = struct.Struct("<QQ")  # latest committed seq, done
+SOURCE_SLOT_HEADER = struct.Struct("<QdB2b5x")  # seq, capture time, hands, handedness per hand
+
+
+class SourceRing:
+    """Frames and landmarks of one tracking process, written in place and read without locks
+    
+    Slots are seqlocks like the tracking ring: the writer stamps the leading seq, fills the
+    slot and stamps the trailing seq, a reader checks the trailing seq before its copy and the
+    leading one after it.
+    """
+    def __init__(self, shm):
+        self.shm = shm
+        magic, self.slots, height, width, self.slot_size = SOURCE_RING_HEADER.unpack_from(shm.buf, 0)
+        if magic != SOURCE_MAGIC:
+            raise ValueError(f"{shm.name} is not a source ring")
+        self.shape = (height, width, 3)
+        base = SOURCE_RING_HEADER.size + SOURCE_RING_STATUS.size
+        self.offsets = [base + i * self.slot_size for i in range(self.slots)]
+        landmarks_size = TRACKING_MAX_HANDS * 21 * 3 * 4
+        self.landmarks = [np.ndarray((TRACKING_MAX_HANDS, 21, 3), np.float32, shm.buf,
+                                     offset + SOURCE_SLOT_HEADER.size) for offset in self.offsets]
+        self.frames = [np.ndarray(self.shape, np.uint8, shm.buf,
+                                  offset + SOURCE_SLOT_HEADER.size + landmarks_size) for offset in self.offsets]
+        self.trailers = [offset + SOURCE_SLOT_HEADER.size + landmarks_size + height * width * 3
+                         for offset in self.offsets]
+        self.seq = 0  # Writer: seq of the slot being filled
+        self.last_seq = 0  # Reader: newest seq handed out
+    
+    @classmethod
+    def create(cls, shape, slots=SOURCE_SLOTS):
+        height, width = shape[:2]
+        slot_size = SOURCE_SLOT_HEADER.size + TRACKING_MAX_HANDS * 21 * 3 * 4 + height * width * 3 + TRACKING_SEQ.size
+        slot_size += -slot_size % 8
+        shm = shared_memory.SharedMemory(create=True, size=SOURCE_RING_HEADER.size + SOURCE_RING_STATUS.size +
+                                         slots * slot_size)
+        SOURCE_RING_HEADER.pack_into(shm.buf, 0, SOURCE_MAGIC, slots, height, width, slot_size)
+        SOURCE_RING_STATUS.pack_into(shm.buf, SOURCE_RING_HEADER.size, 0, 0)
+        return cls(shm)
+    
+    @classmethod
+    def attach(cls, name):
+        return cls(shared_memory.SharedMemory(name=name))
+    
+    @property
+    def name(self):
+        return self.shm.name
+    
+    def status(self):
+        return SOURCE_RING_STATUS.unpack_from(self.shm.buf, SOURCE_RING_HEADER.size)
+    
+    def begin(self):
+        """Frame buffer of the next slot for the writer to fill, then commit()"""
+        self.seq += 1
+        slot = self.seq % self.slots
+        SOURCE_SLOT_HEADER.pack_into(self.shm.buf, self.offsets[slot], self.seq, 0.0, 0, -1, -1)
+        return self.frames[slot]
+    
+    def commit(self, capture_time, landmarks, handedness):
+        slot = self.seq % self.slots
+        n_hands = min(len(landmarks), TRACKING_MAX_HANDS)
+        self.landmarks[slot][:n_hands] = landmarks[:n_hands]
+        sides = list(handedness[:n_hands]) + [-1] * (TRACKING_MAX_HANDS - n_hands)
+        SOURCE_SLOT_HEADER.pack_into(self.shm.buf, self.offsets[slot], self.seq, capture_time, n_hands, *sides)
+        TRACKING_SEQ.pack_into(self.shm.buf, self.trailers[slot], self.seq)
+        SOURCE_RING_STATUS.pack_into(self.shm.buf, SOURCE_RING_HEADER.size, self.seq, 0)
+    
+    def finish(self):
+        """Mark the source as ended, after the last committed frame"""
+        latest, _ = self.status()
+        SOURCE_RING_STATUS.pack_into(self.shm.buf, SOURCE_RING_HEADER.size, latest, 1)
+    
+    def read(self, frame):
+        """Copy the newest frame into frame, (capture_time, results) or None if there is none newer"""
+        seq, _ = self.status()
+        if seq == self.last_seq:
+            return None
+        slot = seq % self.slots
+        if TRACKING_SEQ.unpack_from(self.shm.buf, self.trailers[slot])[0] != seq:
+            return None  # Overwritten since, the next poll picks up the newer frame
+        np.copyto(frame, self.frames[slot])
+        landmarks = self.landmarks[slot].copy()
+        leading, capture_time, n_hands, *sides = SOURCE_SLOT_HEADER.unpack_from(self.shm.buf, self.offsets[slot])
+        if leading != seq:
+            return None
+        self.last_seq = seq
+        return capture_time, ReplayResults(landmarks[:n_hands], np.array(sides[:n_hands], dtype=np.int8))
+    
+    @property
+    def drained(self):
+        return self.status()[0] == self.last_seq
+    
+    @property
+    def done(self):
+        return bool(self.status()[1])
+    
+    def close(self, unlink=False):
+        # The slot views export the buffer, drop them before unmapping
+        self.frames = self.landmarks = None
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+def open_capture(spec, low_latency=False):
+    """cv2.VideoCapture of a camera index or video file, None if it cannot be opened
+    
+    low_latency asks the camera for a one-frame driver buffer and CAPTURE_FOURCC, before
+    the resolution since some backends only apply the format then, and reports the result.
+    """
+    cap = cv2.VideoCapture(spec)
     if not cap.isOpened():
-        print("Error: Cannot open webcam")
+        return None
+    if isinstance(spec, int):
+        buffered = False
+        if low_latency:
+            buffered = cap.set(cv2.CAP_PROP_BUFFERSIZE, CAPTURE_BUFFER_SIZE)
+            if CAPTURE_FOURCC:
+                cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*CAPTURE_FOURCC))
+        # Set camera resolution
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, CAMERA_WIDTH)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, CAMERA_HEIGHT)
+        if low_latency:
+            fourcc = int(cap.get(cv2.CAP_PROP_FOURCC)).to_bytes(4, "little").decode("ascii", "replace")
+            print(f"Capture: {int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))}x{int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))} "
+                  f"{fourcc} @ {cap.get(cv2.CAP_PROP_FPS):.0f} fps, "
+                  f"driver buffer {CAPTURE_BUFFER_SIZE if buffered else 'unchanged'}")
+    return cap
+
+
+def configure_tracking(args):
+    """Apply the hand tracking flags to this process's inference front end and stream"""
+    if args.no_roi:
+        hand_inference.roi = False
+    hand_stream.interval = max(1, args.infer_every)
+    hand_stream.adaptive = args.adaptive_inference
+    if args.no_filter:
+        hand_stream.filter.smoothing = False
+
+
+def tracking_worker(spec, args, ring_name, stop_event):
+    """Tracking process of one source: capture and hand inference straight into a SourceRing
+    
+    Sends the ring name (None if the source cannot be opened) once through ring_name. Video
+    files wait for the hand model, then are timed by their frame rate and paced to it unless
+    --replay-fast is given.
+    """
+    configure_tracking(args)
+    hand_model.start_warm_up()  # Loads while the source opens
+    cap = open_capture(spec)
+    ok, first = cap.read() if cap is not None else (False, None)
+    if not ok:
+        ring_name.send(None)
         return
+    ring = SourceRing.create(first.shape)
+    ring_name.send(ring.name)
+    if isinstance(spec, str):
+        hand_model.warm_up()  # Waits for the warm-up thread, a video file must not play on untracked
+    fps = cap.get(cv2.CAP_PROP_FPS) if isinstance(spec, str) else 0
+    start = time.time()
+    
+    try:
+        while not stop_event.is_set():
+            frame = ring.begin()
+            if first is not None:
+                np.copyto(frame, first)
+                first = None
+            else:
+                ok, read = cap.read(frame)
+                if not ok:
+                    break
+                if not np.shares_memory(read, frame):
+                    if read.shape != frame.shape:
+                        break  # The source changed resolution, the ring cannot hold it
+                    np.copyto(frame, read)
+            
+            if fps > 0:
+                capture_time = start + (ring.seq - 1) / fps
+                delay = capture_time - time.time()
+                if delay > 0 and not args.replay_fast:
+                    time.sleep(delay)
+            else:
+                capture_time = time.time()
+            results = hand_stream.process(frame, capture_time)
+            ring.commit(capture_time, results.landmarks, results.handedness)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # The renderer owns the segment from here and unlinks it
+        ring.finish()
+        ring.close()
+        cap.release()
+
+
+def capture_worker(source, out_queues, stop_event):
+    """Pipeline stage 1: read camera frames and fan them out to the next stages"""
+    while not stop_event.is_set():
+        start = profiler.mark()
+        item = source.read()
+        profiler.add("read", start)
+        if item is None:
+            break
+        for q in out_queues:
+            q.put(item)
+    stop_event.set()
+    for q in out_queues:
+        q.close()
+
+
+def inference_worker(in_queue, out_queue, stop_event, recorder=None):
+    """Pipeline stage 2: run MediaPipe on the captured frames in order"""
+    while not stop_event.is_set():
+        item = in_queue.get(timeout=0.1)
+        if item is None:
+            continue
+        cam_frame, capture_time, results = item
+        results = infer_hands(cam_frame, capture_time, results, recorder)
+        out_queue.put((results, capture_time))
+    out_queue.close()
+
+
+def infer_hands(cam_frame, capture_time, results=None, recorder=None):
+    """Run the hand stream unless the source already carries landmarks, then record the frame"""
+    if results is None:
+        results = hand_stream.process(cam_frame, capture_time)
+    if recorder is not None:
+        recorder.write(cam_frame, capture_time, results)
+    return results
+
+
+def handle_hands(results, cam_frame, prev_pinch, now=None):
+    """Derive cursor, pinch and bar from hand results and handle clicks"""
+    cursor_pos = None
+    pinch_detected = False
+    pinch_distance = 0
+    bar_pos = None
+    hand_points = landmarks_array(results)
+    
+    # Hand detection and tracking
+    if len(hand_points):
+        cam_height, cam_width, _ = cam_frame.shape
+        features = hand_features(hand_points, cam_width, cam_height)
+        
+        # Index finger tips (landmark 8) of every hand in UI space drive the gestures
+        tips_x, tips_y = to_ui(hand_points[:, 8, 0].astype(np.float64), hand_points[:, 8, 1].astype(np.float64))
+        gestures.update(features, np.column_stack([tips_x, tips_y]))
+        
+        # For game: detect two hands and create bar
+        if len(hand_points) == 2 and game.active and not game.game_over:
+            palm_x, palm_y = to_ui(features["palm"][:, 0], features["palm"][:, 1])
+            bar_pos = (int(palm_x[0]), int(palm_y[0]), int(palm_x[1]), int(palm_y[1]))
+        
+        # For UI: use first hand for cursor and pinch
+        cursor_pos = (int(tips_x[0]), int(tips_y[0]))
+        pinch_detected = bool(gestures.active[0, gestures.index("pinch")])
+        pinch_distance = float(features["tip_distances"][0, 0, 1])
+        # Draw cursor on camera frame NOW
+        cam_cursor_x = int((1 - cursor_pos[0] / UI_WIDTH) * cam_width)
+        cam_cursor_y = int((cursor_pos[1] / UI_HEIGHT) * cam_height)
+        cv2.circle(cam_frame, (cam_cursor_x, cam_cursor_y), 12, COLOR_CURSOR, -1)
+        cv2.circle(cam_frame, (cam_cursor_x, cam_cursor_y), 14, (255, 255, 255), 2)
+        if pinch_detected:
+            cv2.circle(cam_frame, (cam_cursor_x, cam_cursor_y), 20, (0, 0, 255), 3)
+            
+        # Handle click (pinch start) - only in UI mode
+        if pinch_detected and not prev_pinch and state.can_click(now):
+            btn = None
+            if not game.active:
+                # Check main buttons and keyboard buttons if visible
+                widgets.set_enabled("keyboard", state.keyboard_visible)
+                widgets.set_enabled("suggestions", state.keyboard_visible)
+                btn = widgets.hit_test("menu", cursor_pos)
+            elif game.game_over:
+                # Handle game over buttons
+                btn = widgets.hit_test("game_over", cursor_pos)
+            if btn is not None:
+                btn.click()
+        
+        prev_pinch = pinch_detected
+    else:
+        # Reset pinch state if no hands detected
+        prev_pinch = False
+        gestures.reset()
+    
+    return cursor_pos, pinch_detected, pinch_distance, bar_pos, hand_points, prev_pinch
+
+
+def draw_cursor(frame, cursor_pos, pinch_detected):
+    """Cursor dot at a UI position, scaled to the frame"""
+    s = frame.shape[1] / UI_WIDTH
+    center = (scaled(cursor_pos[0], s), scaled(cursor_pos[1], s))
+    cv2.circle(frame, center, scaled(12, s), COLOR_CURSOR, -1)
+    cv2.circle(frame, center, scaled(14, s), (255, 255, 255), scaled_thickness(2, s))
+    if pinch_detected:
+        cv2.circle(frame, center, scaled(20, s), (0, 0, 255), scaled_thickness(3, s))
+
+
+def render_frame(cursor_pos, pinch_detected, pinch_distance, fps, cam_frame, hand_points):
+    """Create the UI frame for the current app / game screen, at the output size"""
+    ui_frame = viewport.begin()
+    
+    # Draw appropriate UI
+    if game.active and not game.game_over:
+        draw_game_ui(ui_frame, cursor_pos, fps, cam_frame, hand_points)
+    elif game.game_over:
+        draw_game_ui(ui_frame, cursor_pos, fps, cam_frame, hand_points)  # Draw game state first
+        # Update hover states for game over buttons
+        widgets.hover("game_over", cursor_pos)
+        draw_game_over_ui(ui_frame)
+        # Draw cursor on top
+        if cursor_pos:
+            viewport.overlay(ui_frame, lambda frame: draw_cursor(frame, cursor_pos, pinch_detected))
+    else:
+        # Update hover states
+        widgets.set_enabled("keyboard", state.keyboard_visible)
+        widgets.set_enabled("suggestions", state.keyboard_visible)
+        widgets.hover("menu", cursor_pos)
+        
+        draw_ui(ui_frame, cursor_pos, pinch_detected, pinch_distance, fps, cam_frame, hand_points)
+    
+    return viewport.finish()
+
+
+def run_frame(cam_frame, results, prev_pinch, fps, frame_time=None):
+    """Handle input, update the game and render one UI frame
+    
+    frame_time (the capture time) drives click cooldown and the game clock, so
+    replayed sessions behave the same on every run.
+    """
+    (cursor_pos, pinch_detected, pinch_distance, bar_pos,
+     hand_points, prev_pinch) = handle_hands(results, cam_frame, prev_pinch, frame_time)
+    if len(hand_points):
+        startup.mark("first landmarks")
+    publisher.publish(frame_time, results, cursor_pos, pinch_detected, pinch_distance, bar_pos)
+    
+    # Update game state
+    start = profiler.mark()
+    if game.active and not game.game_over:
+        game.update(bar_pos, frame_time)
+    profiler.add("game", start)
     
-    # Set camera resolution
-    cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+    start = profiler.mark()
+    ui_frame = render_frame(cursor_pos, pinch_detected, pinch_distance, fps,
+                            cam_frame, hand_points)
+    profiler.add("widgets", start, exclude=("background", "landmarks"))
     
+    if profiler.show_overlay:
+        profiler.draw_overlay(ui_frame)
+    return ui_frame, prev_pinch
+
+
+# Output sinks: write(frame) returns False when the user wants to quit, close() flushes
+class WindowSink:
+    """HighGUI window, keys: 'q' quits, 'p' toggles the profiling overlay"""
+    def __init__(self, title="Hand-Controlled Desktop UI"):
+        self.title = title
+    
+    def write(self, frame):
+        cv2.imshow(self.title, frame)
+        
+        # Quit on 'q' or window close, 'p' toggles the profiling overlay
+        key = cv2.waitKey(1) & 0xFF
+        if key == ord('q'):
+            return False
+        if key == ord('p'):
+            profiler.toggle_overlay()
+        if cv2.getWindowProperty(self.title, cv2.WND_PROP_VISIBLE) < 1:
+            return False
+        return True
+    
+    def close(self):
+        cv2.destroyAllWindows()
+
+
+class NullSink:
+    """Discards frames, for headless runs and throughput measurements"""
+    def write(self, frame):
+        return True
+    
+    def close(self):
+        pass
+
+
+class BackgroundSink:
+    """Hands frames to a writer thread through a fixed set of buffers, dropping
+    new frames while all of them are still queued"""
+    def __init__(self, queue_depth=SINK_QUEUE_DEPTH):
+        self.queue_depth = queue_depth
+        self.free = None  # Buffers ready to be filled, allocated on the first frame
+        self.pending = deque()
+        self.cond = threading.Condition()
+        self.closed = False
+        self.written = 0
+        self.dropped = 0
+        self.thread = threading.Thread(target=self.run, name=type(self).__name__, daemon=True)
+        self.thread.start()
+    
+    def write(self, frame):
+        with self.cond:
+            if self.free is None:
+                self.free = deque(np.empty_like(frame) for _ in range(self.queue_depth))
+            if not self.free:
+                self.dropped += 1
+                return True
+            buf = self.free.popleft()
+        np.copyto(buf, frame)
+        with self.cond:
+            self.pending.append(buf)
+            self.cond.notify()
+        return True
+    
+    def run(self):
+        while True:
+            with self.cond:
+                while not self.pending and not self.closed:
+                    self.cond.wait()
+                if not self.pending:
+                    break
+                buf = self.pending.popleft()
+            self.encode(buf)
+            self.written += 1
+            with self.cond:
+                self.free.append(buf)
+        self.finish()
+    
+    def close(self):
+        """Write out the queued frames and stop the thread"""
+        with self.cond:
+            self.closed = True
+            self.cond.notify()
+        self.thread.join()
+    
+    def encode(self, frame):
+        raise NotImplementedError
+    
+    def finish(self):
+        pass
+
+
+class RawFrameSink(BackgroundSink):
+    """Appends raw BGR frames to a file (ffmpeg: -f rawvideo -pix_fmt bgr24 -s WxH)"""
+    def __init__(self, path, queue_depth=SINK_QUEUE_DEPTH):
+        self.file = open(path, "wb")
+        super().__init__(queue_depth)
+    
+    def encode(self, frame):
+        self.file.write(frame.data)
+    
+    def finish(self):
+        self.file.close()
+
+
+class VideoSink(BackgroundSink):
+    """Encodes frames with cv2.VideoWriter on its own thread"""
+    def __init__(self, path, fps=VIDEO_FPS, fourcc=VIDEO_FOURCC, queue_depth=SINK_QUEUE_DEPTH):
+        self.path = path
+        self.fps = fps
+        self.fourcc = fourcc
+        self.writer = None  # Opened on the first frame, when its size is known
+        super().__init__(queue_depth)
+    
+    def encode(self, frame):
+        if self.writer is None:
+            self.writer = cv2.VideoWriter(self.path, cv2.VideoWriter_fourcc(*self.fourcc),
+                                          self.fps, (frame.shape[1], frame.shape[0]))
+        self.writer.write(frame)
+    
+    def finish(self):
+        if self.writer is not None:
+            self.writer.release()
+
+
+def present_frame(ui_frame, sinks, frame_start, capture_time=None):
+    """Write the frame to every sink and close its profiling row, returns False to quit"""
+    start = profiler.mark()
+    keep_running = all([sink.write(ui_frame) for sink in sinks])
+    profiler.add("display", start)
+    latency.add(capture_time)
+    quality.end_frame()
+    startup.mark("first frame")
+    profiler.add("total", frame_start)
+    profiler.end_frame()
+    return keep_running
+
+
+def run_serial(source, sinks, recorder=None):
+    """Original loop: capture, inference and render one after another"""
     prev_time = time.time()
     prev_pinch = False
     
-    print("Hand-Controlled Desktop UI Started")
-    print("Controls:")
-    print("- Move index finger to control cursor")
-    print("- Pinch thumb and index finger to click")
-    print("- Use BOTH HANDS in game to create the bar")
-    print("- Toggle 'Camera BG' to show/hide camera background")
-    print("- Toggle 'Show Hands' to show/hide hand landmarks")
-    print("- Press 'q' to quit")
-    
     while True:
-        ret, cam_frame = cap.read()
-        if not ret:
+        frame_start = profiler.mark()
+        item = source.read(reuse=True)
+        profiler.add("read", frame_start)
+        if item is None:
             break
+        quality.begin_frame()
+        cam_frame, capture_time, results = item
         
         # Process frame with MediaPipe
-        cam_frame_rgb = cv2.cvtColor(cam_frame, cv2.COLOR_BGR2RGB)
-        results = hands.process(cam_frame_rgb)
+        results = infer_hands(cam_frame, capture_time, results, recorder)
         
-        # Draw hand landmarks on camera frame if enabled
-        if state.show_hand_landmarks and results.multi_hand_landmarks:
-            for hand_landmarks in results.multi_hand_landmarks:
-                mp_drawing.draw_landmarks(
-                    cam_frame,
-                    hand_landmarks,
-                    mp_hands.HAND_CONNECTIONS,
-                    mp_drawing_styles.get_default_hand_landmarks_style(),
-                    mp_drawing_styles.get_default_hand_connections_style()
-                )
-
         # Calculate FPS
         current_time = time.time()
         fps = 1 / (current_time - prev_time) if (current_time - prev_time) > 0 else 0
         prev_time = current_time
         
-        cursor_pos = None
-        pinch_detected = False
-        pinch_distance = 0
-        bar_pos = None
-        hand_landmarks_list = []
+        ui_frame, prev_pinch = run_frame(cam_frame, results, prev_pinch, fps, capture_time)
         
-        # Hand detection and tracking
-        if results.multi_hand_landmarks:
-            cam_height, cam_width, _ = cam_frame.shape
-            hand_landmarks_list = results.multi_hand_landmarks
+        if not present_frame(ui_frame, sinks, frame_start, capture_time):
+            break
+
+
+def run_pipelined(source, sinks, stages=PIPELINE_STAGES, queue_depth=PIPELINE_QUEUE_DEPTH,
+                  recorder=None):
+    """Pipelined loop: capture and inference run on their own threads, render stays on main"""
+    stop_event = threading.Event()
+    frame_queue = LatestQueue(queue_depth)
+    workers = []
+    
+    if stages >= 3:
+        inference_queue = LatestQueue(queue_depth)
+        results_queue = LatestQueue(queue_depth)
+        workers.append(threading.Thread(target=capture_worker, name="capture",
+                                        args=(source, [frame_queue, inference_queue], stop_event),
+                                        daemon=True))
+        workers.append(threading.Thread(target=inference_worker, name="inference",
+                                        args=(inference_queue, results_queue, stop_event, recorder),
+                                        daemon=True))
+    else:
+        results_queue = None
+        workers.append(threading.Thread(target=capture_worker, name="capture",
+                                        args=(source, [frame_queue], stop_event),
+                                        daemon=True))
+    
+    for worker in workers:
+        worker.start()
+    
+    prev_time = time.time()
+    prev_pinch = False
+    results = None
+    results_time = None  # Capture time of the frame the landmarks were inferred from
+    
+    try:
+        while not stop_event.is_set() or frame_queue.items:
+            frame_start = profiler.mark()
+            item = frame_queue.get(timeout=0.5)
+            if item is None:
+                continue
+            quality.begin_frame()
+            hand_model.check()  # The inference thread stops on a failed model, stop here too
+            cam_frame, capture_time, frame_results = item
             
-            # For game: detect two hands and create bar
-            if len(results.multi_hand_landmarks) == 2 and game.active and not game.game_over:
-                palm1 = get_palm_center(results.multi_hand_landmarks[0], cam_width, cam_height)
-                palm2 = get_palm_center(results.multi_hand_landmarks[1], cam_width, cam_height)
-                bar_pos = (palm1[0], palm1[1], palm2[0], palm2[1])
+            if results_queue is not None:
+                # Take the next landmarks in order, keep the last ones until new arrive
+                latest = results_queue.get(timeout=0)
+                if latest is not None:
+                    results, results_time = latest
+                # Frame is shared with the inference stage, draw on a private copy
+                private = frame_pool.get("camera", cam_frame.shape)
+                np.copyto(private, cam_frame)
+                cam_frame = private
+            else:
+                results = infer_hands(cam_frame, capture_time, frame_results, recorder)
+                results_time = capture_time
             
-            # For UI: use first hand for cursor
-            hand_landmarks = results.multi_hand_landmarks[0]
+            # Calculate FPS
+            current_time = time.time()
+            fps = 1 / (current_time - prev_time) if (current_time - prev_time) > 0 else 0
+            prev_time = current_time
             
-            # Get index finger tip position (landmark 8)
-            index_tip = hand_landmarks.landmark[8]
-            cursor_pos = map_to_ui(index_tip.x, index_tip.y, cam_width, cam_height)
+            # Gestures, the game clock, publishing and latency go by the landmarks' capture time,
+            # which trails the drawn frame by the inference stage
+            frame_time = capture_time if results is None else results_time
+            ui_frame, prev_pinch = run_frame(cam_frame, results, prev_pinch, fps, frame_time)
             
-            # Detect pinch gesture
-            pinch_detected, pinch_distance = detect_pinch(hand_landmarks, cam_width, cam_height)
-            # Draw cursor on camera frame NOW
-            cam_cursor_x = int((1 - cursor_pos[0] / UI_WIDTH) * cam_width)
-            cam_cursor_y = int((cursor_pos[1] / UI_HEIGHT) * cam_height)
-            cv2.circle(cam_frame, (cam_cursor_x, cam_cursor_y), 12, COLOR_CURSOR, -1)
-            cv2.circle(cam_frame, (cam_cursor_x, cam_cursor_y), 14, (255, 255, 255), 2)
-            if pinch_detected:
-                cv2.circle(cam_frame, (cam_cursor_x, cam_cursor_y), 20, (0, 0, 255), 3)
+            if not present_frame(ui_frame, sinks, frame_start, frame_time):
+                break
+    finally:
+        stop_event.set()
+        for worker in workers:
+            worker.join(timeout=1.0)
+
+
+# One source of a multi-source run: its tracking process, frame ring and its own app / game state.
+# The first session uses the module-level state, activate() points the frame loop at a session.
+class SourceSession:
+    def __init__(self, spec, index, sinks, args, context, stop_event):
+        self.spec = spec
+        self.index = index
+        self.sinks = sinks
+        if index == 0:
+            self.state, self.game, self.gestures, self.publisher = state, game, gestures, publisher
+        else:
+            self.state = AppState()
+            self.game = GameState(args.stress or TOTAL_BALLS, args.seed)
+            self.gestures = GestureClassifier()
+            self.publisher = TrackingPublisher()  # Only the first source is published
+        self.prev_pinch = False
+        self.prev_time = time.time()
+        self.rendered = 0
+        self.tracked = 0  # Frames the process tracked, known once the session is closed
+        self.ring = None
+        self.ring_name, self.child_end = context.Pipe(duplex=False)
+        self.process = context.Process(target=tracking_worker, name=f"tracking-{index}",
+                                       args=(spec, args, self.child_end, stop_event), daemon=True)
+    
+    def start(self):
+        self.process.start()
+        self.child_end.close()  # So a process that dies early shows up as end of file
+    
+    def connect(self, timeout=SOURCE_START_TIMEOUT):
+        """Attach to the ring once the process has opened its source, False if it could not"""
+        try:
+            name = self.ring_name.recv() if self.ring_name.poll(timeout) else None
+        except EOFError:
+            name = None
+        if name is None:
+            return False
+        self.ring = SourceRing.attach(name)
+        return True
+    
+    def activate(self):
+        global state, game, gestures, publisher
+        state, game, gestures, publisher = self.state, self.game, self.gestures, self.publisher
+    
+    def read(self):
+        """(cam_frame, capture_time, results) of the newest tracked frame, None if nothing new"""
+        cam_frame = frame_pool.get(("source", self.index), self.ring.shape)
+        item = self.ring.read(cam_frame)
+        if item is None:
+            return None
+        return (cam_frame, *item)
+    
+    @property
+    def finished(self):
+        return self.ring is None or (self.ring.drained and (self.ring.done or not self.process.is_alive()))
+    
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+        self.process.join(timeout=2.0)
+        if self.process.is_alive():
+            self.process.terminate()
+        if self.ring is not None:
+            self.tracked = self.ring.status()[0]
+            self.ring.close(unlink=True)
+
+
+def run_sessions(specs, args):
+    """Multi-source loop: each source is tracked in its own process, the renderer draws a
+    session whenever its ring holds a new frame"""
+    context = multiprocessing.get_context("spawn")  # A MediaPipe graph does not survive fork()
+    stop_event = context.Event()
+    sessions = [SourceSession(spec, i, build_sinks(args, i if len(specs) > 1 else None), args, context, stop_event)
+                for i, spec in enumerate(specs)]
+    for session in sessions:
+        session.start()
+    
+    try:
+        live = []
+        for session in sessions:
+            if session.connect():
+                live.append(session)
+            else:
+                print(f"Error: Cannot open source {session.spec}")
+        
+        while live:
+            rendered = False
+            for session in live:
+                frame_start = profiler.mark()
+                item = session.read()
+                if item is None:
+                    continue
+                profiler.add("read", frame_start)
+                quality.begin_frame()
+                cam_frame, capture_time, results = item
+                session.activate()
                 
-            # Handle click (pinch start) - only in UI mode
-            if pinch_detected and not prev_pinch and state.can_click():
-                if not game.active:
-                    # Check main buttons
-                    for btn in buttons:
-                        if btn.contains(cursor_pos[0], cursor_pos[1]):
-                            btn.click()
-                            break
-                    
-                    # Check keyboard buttons if visible
-                    if state.keyboard_visible:
-                        kb_buttons = create_keyboard_buttons()
-                        for kb_btn in kb_buttons:
-                            if kb_btn.contains(cursor_pos[0], cursor_pos[1]):
-                                kb_btn.click()
-                                break
+                # Calculate FPS
+                current_time = time.time()
+                fps = 1 / (current_time - session.prev_time) if (current_time - session.prev_time) > 0 else 0
+                session.prev_time = current_time
                 
-                elif game.game_over:
-                    # Handle game over buttons
-                    temp_frame = np.zeros((UI_HEIGHT, UI_WIDTH, 3), dtype=np.uint8)
-                    game_over_buttons = draw_game_over_ui(temp_frame)
-                    for btn in game_over_buttons:
-                        if btn.contains(cursor_pos[0], cursor_pos[1]):
-                            btn.click()
-                            break
-            
-            prev_pinch = pinch_detected
+                ui_frame, session.prev_pinch = run_frame(cam_frame, results, session.prev_pinch, fps, capture_time)
+                session.rendered += 1
+                if not present_frame(ui_frame, session.sinks, frame_start, capture_time):
+                    return
+                rendered = True
+            if not rendered:
+                live = [session for session in live if not session.finished]
+                time.sleep(SOURCE_POLL)
+    finally:
+        stop_event.set()
+        sessions[0].activate()
+        for session in sessions:
+            session.close()
+            print(f"Source {session.spec}: {session.tracked} frames tracked, {session.rendered} rendered")
+
+
+def draw_splash(frame, lines):
+    """Startup screen: title and one status line per background task"""
+    np.copyto(frame, frame_pool.filled(COLOR_BG, frame.shape))
+    s = frame.shape[1] / UI_WIDTH
+    x = scaled(UI_WIDTH // 2 - 330, s)
+    text_cache.draw(frame, "HAND-CONTROLLED DESKTOP UI", (x, scaled(UI_HEIGHT // 2 - 40, s)),
+                    1.2 * s, COLOR_TEXT, scaled_thickness(2, s))
+    for i, line in enumerate(lines):
+        text_cache.draw(frame, line, (x, scaled(UI_HEIGHT // 2 + 20 + 35 * i, s)),
+                        0.7 * s, (180, 180, 180), scaled_thickness(1, s))
+
+
+def model_status():
+    """Splash line for the hand model warm-up"""
+    if not hand_model.ready.is_set():
+        return "Loading hand model..."
+    return "Hand model failed to load" if hand_model.error is not None else "Hand model ready"
+
+
+def show_splash(display, spec=0, low_latency=False):
+    """Keep the splash screen on the display sink while the camera opens on a thread
+    
+    Returns the opened capture, or None if there is no camera. For a camera, the hand model
+    goes on warming up after this returns and frames are shown without landmarks until it is
+    ready. A video file also waits for the model, so no part of it plays untracked.
+    """
+    opened = []
+    opener = threading.Thread(target=lambda: opened.append(open_capture(spec, low_latency)),
+                              name="camera open", daemon=True)
+    opener.start()
+    wait_model = isinstance(spec, str)
+    frame = frame_pool.get("output", viewport.shape(viewport.output_scale))
+    while opener.is_alive() or (wait_model and opened[0] is not None and not hand_model.ready.is_set()):
+        if opener.is_alive():
+            elapsed = time.perf_counter() - startup.start
+            draw_splash(frame, [f"Opening camera... {elapsed:.1f} s", model_status()])
         else:
-            # Reset pinch state if no hands detected
-            prev_pinch = False
-        
-        # Update game state
-        if game.active and not game.game_over:
-            game.update(bar_pos)
-        
-        # Create UI frame
-        ui_frame = np.zeros((UI_HEIGHT, UI_WIDTH, 3), dtype=np.uint8)
-        
-        # Draw appropriate UI
-        if game.active and not game.game_over:
-            draw_game_ui(ui_frame, cursor_pos, fps, cam_frame, hand_landmarks_list)
-        elif game.game_over:
-            draw_game_ui(ui_frame, cursor_pos, fps, cam_frame, hand_landmarks_list)  # Draw game state first
-            game_over_buttons = draw_game_over_ui(ui_frame)
-            # Update hover states for game over buttons
-            for btn in game_over_buttons:
-                btn.is_hovered = btn.contains(cursor_pos[0], cursor_pos[1]) if cursor_pos else False
-                btn.draw(ui_frame)
-            # Draw cursor on top
-            if cursor_pos:
-                cv2.circle(ui_frame, cursor_pos, 12, COLOR_CURSOR, -1)
-                cv2.circle(ui_frame, cursor_pos, 14, (255, 255, 255), 2)
-                if pinch_detected:
-                    cv2.circle(ui_frame, cursor_pos, 20, (0, 0, 255), 3)
+            startup.mark("camera open")
+            draw_splash(frame, ["Camera open", model_status()])
+        display.write(frame)
+        startup.mark("splash")
+        if opener.is_alive():
+            opener.join(SPLASH_REFRESH)
         else:
-            # Update hover states
-            for btn in buttons:
-                btn.is_hovered = btn.contains(cursor_pos[0], cursor_pos[1]) if cursor_pos else False
-            
-            draw_ui(ui_frame, cursor_pos, pinch_detected, pinch_distance, fps, cam_frame, hand_landmarks_list)
-        
-        # Display
-        cv2.imshow("Hand-Controlled Desktop UI", ui_frame)
+            hand_model.ready.wait(SPLASH_REFRESH)
+    cap = opened[0] if opened else None
+    if cap is not None:
+        startup.mark("camera open")
+    return cap
+
+
+def parse_source(text):
+    """Camera index or video file path"""
+    return int(text) if text.isdigit() else text
+
+
+def build_sinks(args, tag=None):
+    """Window (or null) sink plus the requested file sinks, tagged per source in multi-source runs"""
+    def tagged(path):
+        root, ext = os.path.splitext(path)
+        return path if tag is None else f"{root}-{tag}{ext}"
+    
+    title = "Hand-Controlled Desktop UI" if tag is None else f"Hand-Controlled Desktop UI [{tag}]"
+    sinks = [NullSink() if args.no_display else WindowSink(title)]
+    if args.video_out:
+        sinks.append(VideoSink(tagged(args.video_out)))
+    if args.raw_out:
+        sinks.append(RawFrameSink(tagged(args.raw_out)))
+    return sinks
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Hand-Controlled Desktop UI")
+    parser.add_argument("--serial", action="store_true",
+                        help="run capture, inference and render one after another")
+    parser.add_argument("--stages", type=int, choices=(1, 2, 3), default=PIPELINE_STAGES,
+                        help="number of pipeline stages")
+    parser.add_argument("--queue-depth", type=int, default=PIPELINE_QUEUE_DEPTH,
+                        help="items kept per stage queue before the oldest is dropped")
+    parser.add_argument("--camera", type=parse_source, default=0, metavar="SRC",
+                        help="camera index or a video file standing in for the camera")
+    parser.add_argument("--low-latency", action="store_true", default=CAPTURE_LOW_LATENCY,
+                        help="grab frames on a thread and keep only the newest one")
+    parser.add_argument("--sources", type=parse_source, nargs="+", metavar="SRC",
+                        help="camera indices or video files, each tracked in its own process")
+    parser.add_argument("--stress", type=int, nargs="?", const=STRESS_BALLS, default=None,
+                        metavar="BALLS", help=f"stress mode with many balls (default {STRESS_BALLS})")
+    parser.add_argument("--seed", type=int, default=GAME_SEED,
+                        help="seed the ball game for reproducible runs")
+    parser.add_argument("--no-roi", action="store_true",
+                        help="always run hand inference on the full camera frame")
+    parser.add_argument("--infer-every", type=int, default=INFERENCE_INTERVAL, metavar="N",
+                        help="run hand inference every Nth frame and predict landmarks in between")
+    parser.add_argument("--adaptive-inference", action="store_true",
+                        help="skip hand inference while the hands move slowly")
+    parser.add_argument("--no-filter", action="store_true",
+                        help="disable landmark smoothing")
+    parser.add_argument("--publish-shm", nargs="?", const=TRACKING_SHM_NAME, metavar="NAME",
+                        help="publish landmarks and gesture events to a shared-memory ring")
+    parser.add_argument("--publish-socket", nargs="?", const=TRACKING_SOCKET_PATH, metavar="PATH",
+                        help="stream landmarks and gesture events on a Unix domain socket")
+    parser.add_argument("--record", metavar="PATH",
+                        help="record camera frames and hand landmarks to a session file")
+    parser.add_argument("--record-encoding", choices=tuple(SESSION_ENCODINGS), default=SESSION_ENCODING,
+                        help="how recorded camera frames are stored")
+    parser.add_argument("--replay", metavar="PATH",
+                        help="replay a recorded session instead of the camera (no MediaPipe)")
+    parser.add_argument("--replay-fast", action="store_true",
+                        help="replay as fast as possible instead of in real time")
+    parser.add_argument("--frame-budget", type=float, default=GOVERNOR_BUDGET_MS, metavar="MS",
+                        help="frame time the quality governor holds by dropping detail")
+    parser.add_argument("--no-governor", action="store_true",
+                        help="always render at full quality")
+    parser.add_argument("--render-scale", type=float, default=RENDER_SCALE, metavar="S",
+                        help="draw the scene at this fraction of the output resolution, upscaled once")
+    parser.add_argument("--output-scale", type=float, default=OUTPUT_SCALE, metavar="S",
+                        help="window / video size as a multiple of 1280x720 (2 = 2560x1440, 3 = 4K)")
+    parser.add_argument("--crisp-text", action="store_true", default=CRISP_TEXT,
+                        help="draw panels, buttons and text after the upscale, at output resolution")
+    parser.add_argument("--no-display", action="store_true",
+                        help="do not open a window (headless runs)")
+    parser.add_argument("--video-out", metavar="PATH",
+                        help="encode the UI to a video file on a background thread")
+    parser.add_argument("--raw-out", metavar="PATH",
+                        help="dump raw BGR UI frames to a file on a background thread")
+    parser.add_argument("--profile", action="store_true",
+                        help="time each stage and show p50/p95/p99 in an overlay ('p' toggles)")
+    parser.add_argument("--trace-allocs", action="store_true",
+                        help="show temporary allocations per frame in the profiling overlay")
+    parser.add_argument("--profile-out", metavar="PATH",
+                        help="stream per-frame stage timings to a .csv or .jsonl file")
+    args = parser.parse_args(argv)
+    if args.sources and (args.replay or args.record):
+        parser.error("--sources cannot be combined with --replay or --record")
+    if args.render_scale <= 0 or args.output_scale <= 0:
+        parser.error("--render-scale and --output-scale must be positive")
+    return args
+
+
+def main(argv=None):
+    """Main application loop"""
+    args = parse_args(argv)
+    startup.begin()
+    if args.stress:
+        game.set_ball_count(args.stress)
+    seed = args.seed
+    if seed is None and args.record:
+        seed = int(np.random.default_rng().integers(2 ** 31))  # Stored in the session for its replay
+    if seed is not None:
+        game.seed(seed)
+    
+    configure_tracking(args)
+    if (args.render_scale, args.output_scale, args.crisp_text) != (RENDER_SCALE, OUTPUT_SCALE, CRISP_TEXT):
+        set_render_scale(args.render_scale, args.output_scale, args.crisp_text)
+    quality.budget = args.frame_budget / 1000
+    # Replays keep full quality so their output does not depend on the machine
+    quality.enabled = not (args.no_governor or args.replay)
+    if args.sources:
+        quality.remove_step("inference")  # Hands are tracked in the source processes
+    # Recorded capture times, and the frame-rate times of video files in --sources, are not on this clock
+    latency.enabled = not (args.replay or any(isinstance(spec, str) for spec in args.sources or ()))
+    if args.trace_allocs:
+        profiler.trace_allocations()
+    if args.profile or args.trace_allocs:
+        profiler.toggle_overlay()
+    if args.profile_out:
+        profiler.open_export(args.profile_out)
+    
+    if args.publish_shm:
+        publisher.open_shm(args.publish_shm)
+    if args.publish_socket:
+        publisher.open_socket(args.publish_socket)
+    
+    recorder = None
+    if args.record:
+        recorder = SessionWriter(args.record, args.record_encoding, seed=seed)
+    
+    print("Hand-Controlled Desktop UI Started")
+    print("Controls:")
+    print("- Move index finger to control cursor")
+    print("- Pinch thumb and index finger to click")
+    print("- Use BOTH HANDS in game to create the bar")
+    print("- Toggle 'Camera BG' to show/hide camera background")
+    print("- Toggle 'Show Hands' to show/hide hand landmarks")
+    print("- Press 'q' to quit")
+    
+    sinks = [] if args.sources else build_sinks(args)
+    source = None  # --sources opens its cameras / files in the tracking processes
+    try:
+        if args.replay:
+            source = ReplaySource(args.replay, realtime=not args.replay_fast)
+            if args.seed is None:
+                # Play the recorded game again; without the seed the balls would differ every run
+                game.seed(REPLAY_SEED if source.reader.seed is None else source.reader.seed)
+        elif not args.sources:
+            # Model and camera load in the background while the splash screen is up
+            hand_model.start_warm_up()
+            cap = show_splash(sinks[0], args.camera, args.low_latency)
+            if cap is None:
+                print("Error: Cannot open webcam")
+                return
+            if args.low_latency:
+                # A video file stands in for a camera at its own frame rate
+                fps = cap.get(cv2.CAP_PROP_FPS) if isinstance(args.camera, str) else 0
+                source = GrabberSource(cap, fps)
+            else:
+                source = CameraSource(cap)
         
-        # Quit on 'q' or window close
-        key = cv2.waitKey(1) & 0xFF
-        if key == ord('q'):
-            break
-        if cv2.getWindowProperty("Hand-Controlled Desktop UI", cv2.WND_PROP_VISIBLE) < 1:
-            break
-    cap.release()
-    cv2.destroyAllWindows()
-    hands.close()
+        if args.sources:
+            run_sessions(args.sources, args)
+        # Replays run serially so every recorded frame is processed once, in order
+        elif args.serial or args.stages == 1 or not PIPELINE_ENABLED or args.replay:
+            run_serial(source, sinks, recorder)
+        else:
+            run_pipelined(source, sinks, args.stages, args.queue_depth, recorder)
+    finally:
+        if recorder is not None:
+            recorder.close()
+        for sink in sinks:
+            sink.close()
+        publisher.close()
+        profiler.close()
+        if source is not None:
+            source.release()
+        hand_model.close()
+        dispatcher.close()
+    
+    for line in dispatcher.summary():
+        print(line)
+    if latency.samples:
+        print("Capture-to-display latency: p50 {:.1f} ms, p95 {:.1f} ms".format(*latency.percentiles()))
 
 
 if __name__ == "__main__":
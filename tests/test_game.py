@@ -0,0 +1,36 @@
+import numpy as np
+
+import hand_ui_prototype as app
+
+
+def rising_bar_game(balls=400, seed=0):
+    game = app.GameState()
+    game.seed(seed)
+    game.start_game()
+    game.balls_spawned = game.total_balls  # Only the balls placed here
+    rng = np.random.default_rng(seed)
+    game.balls.spawn(rng.uniform(50, app.UI_WIDTH - 50, balls), rng.uniform(100, 600, balls))
+    return game
+
+
+def test_fast_bar_does_not_pass_through_balls():
+    # At 60 fps every other frame runs no tick, the bar still moves on those frames
+    for fps, speed in ((60, 600), (120, 600), (30, 1200)):
+        game = rising_bar_game()
+        y = 700.0
+        for frame in range(1, 2 * fps):
+            y = max(0.0, 700.0 - speed * frame / fps)
+            game.update((0, y, app.UI_WIDTH, y), frame / fps)
+            if game.bar_pos:
+                n = len(game.balls)
+                below = game.balls.y[:n] > game.bar_pos[1]
+                assert not below.any(), (fps, speed, frame, int(below.sum()))
+        assert game.score > 0
+
+
+def test_display_bar_follows_hands_between_ticks():
+    game = rising_bar_game(balls=0)
+    game.update((0, 700, app.UI_WIDTH, 700), 0.0)
+    game.update((0, 690, app.UI_WIDTH, 690), 0.01)  # Less than a tick later
+    assert game.display_bar == (0, 690, app.UI_WIDTH, 690)
+    assert game.bar_pos is None
@@ -0,0 +1,38 @@
+import numpy as np
+
+import hand_ui_prototype as app
+
+
+def write_session(path, seed, frames=150, fps=30):
+    """Two hands moving a bar across the screen, on a black camera frame"""
+    writer = app.SessionWriter(str(path), "raw", seed=seed)
+    cam_frame = np.zeros((48, 64, 3), dtype=np.uint8)
+    for i in range(frames):
+        x = 0.2 + 0.6 * i / frames
+        landmarks = np.full((2, 21, 3), 0.0, dtype=np.float32)
+        landmarks[0, :, :2] = (x - 0.15, 0.7)
+        landmarks[1, :, :2] = (x + 0.15, 0.7)
+        writer.write(cam_frame, i / fps, app.ReplayResults(landmarks, np.array([0, 1], np.int8)))
+    writer.close()
+
+
+def replay_game(path, *args):
+    app.game.start_game()  # The recorded hands only move the bar, they do not open the game
+    app.main(["--replay", str(path), "--replay-fast", "--no-display", *args])
+    n = len(app.game.balls)
+    return app.game.score, app.game.sim_time, app.game.balls.x[:n].tolist(), app.game.balls.y[:n].tolist()
+
+
+def test_replay_restores_recorded_seed(tmp_path):
+    path = tmp_path / "session.huis"
+    write_session(path, seed=1234)
+    assert app.SessionReader(str(path)).seed == 1234
+    first = replay_game(path)
+    assert first[2], "no balls spawned"
+    assert replay_game(path) == first
+
+
+def test_replay_without_recorded_seed_is_repeatable(tmp_path):
+    path = tmp_path / "session.huis"
+    write_session(path, seed=None)
+    assert replay_game(path) == replay_game(path)
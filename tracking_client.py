@@ -0,0 +1,189 @@
+"""
+Tracking Client
+Reads the hand landmarks and gesture events published by hand_ui_prototype.py
+(--publish-shm / --publish-socket) without running MediaPipe a second time
+"""
+
+import argparse
+import socket
+import struct
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+# Record layout, shared by the shared-memory ring and the socket stream:
+#   header + landmarks (TRACKING_MAX_HANDS x 21 x 3 float32) + trailing sequence number
+TRACKING_MAGIC = b"HUITRK02"
+TRACKING_MAX_HANDS = 2
+TRACKING_HEADER = struct.Struct("<QdBB6xhhhhhhf")  # seq, time, hands, flags, cursor, bar, pinch distance
+TRACKING_LANDMARKS = TRACKING_MAX_HANDS * 21 * 3 * 4
+TRACKING_SEQ = struct.Struct("<Q")
+TRACKING_RECORD_SIZE = TRACKING_HEADER.size + TRACKING_LANDMARKS + TRACKING_SEQ.size
+
+# Shared memory: ring header (magic, record size, slots, publisher pid, latest seq) followed by the slots
+TRACKING_RING_HEADER = struct.Struct("<8sIII4xQ")
+TRACKING_SLOTS = 64
+TRACKING_SHM_NAME = "hand_ui_tracking"
+
+# Socket stream: hello (magic, record size) followed by one record per frame
+TRACKING_HELLO = struct.Struct("<8sI")
+TRACKING_SOCKET_PATH = "/tmp/hand_ui_tracking.sock"
+
+# Flag bits
+FLAG_PINCH = 1
+FLAG_PINCH_DOWN = 2
+FLAG_PINCH_UP = 4
+FLAG_CURSOR = 8
+FLAG_BAR = 16
+
+
+def encode_record(buf, offset, seq, capture_time, landmarks, flags, cursor, bar, pinch_distance):
+    """Write one record into buf at offset, leading seq first and trailing seq last"""
+    n_hands = min(len(landmarks), TRACKING_MAX_HANDS)
+    TRACKING_HEADER.pack_into(buf, offset, seq, capture_time, n_hands, flags,
+                              *(cursor or (0, 0)), *(bar or (0, 0, 0, 0)), pinch_distance)
+    start = offset + TRACKING_HEADER.size
+    points = np.frombuffer(buf, dtype=np.float32, count=TRACKING_LANDMARKS // 4, offset=start)
+    points[:n_hands * 63] = landmarks[:n_hands].ravel()
+    TRACKING_SEQ.pack_into(buf, start + TRACKING_LANDMARKS, seq)
+
+
+def decode_record(buf, offset=0):
+    """Record as a dict, or None if it was overwritten while being copied"""
+    (seq, capture_time, n_hands, flags, cx, cy,
+     bx1, by1, bx2, by2, pinch_distance) = TRACKING_HEADER.unpack_from(buf, offset)
+    start = offset + TRACKING_HEADER.size
+    if TRACKING_SEQ.unpack_from(buf, start + TRACKING_LANDMARKS)[0] != seq:
+        return None
+    landmarks = np.frombuffer(buf, dtype=np.float32, count=n_hands * 63, offset=start)
+    return {
+        "seq": seq,
+        "time": capture_time,
+        "landmarks": landmarks.reshape(n_hands, 21, 3).copy(),
+        "cursor": (cx, cy) if flags & FLAG_CURSOR else None,
+        "pinch": bool(flags & FLAG_PINCH),
+        "pinch_down": bool(flags & FLAG_PINCH_DOWN),
+        "pinch_up": bool(flags & FLAG_PINCH_UP),
+        "pinch_distance": pinch_distance,
+        "bar": (bx1, by1, bx2, by2) if flags & FLAG_BAR else None,
+    }
+
+
+class SharedMemoryReader:
+    """Polls the publisher's ring buffer, never blocks the producer"""
+    def __init__(self, name=TRACKING_SHM_NAME):
+        self.shm = shared_memory.SharedMemory(name=name)
+        # Attaching registers the segment with the resource tracker, which would
+        # unlink it when this reader exits; the publisher owns it
+        resource_tracker.unregister(self.shm._name, "shared_memory")
+        magic, record_size, self.slots, _, _ = TRACKING_RING_HEADER.unpack_from(self.shm.buf, 0)
+        if magic != TRACKING_MAGIC or record_size != TRACKING_RECORD_SIZE:
+            raise ValueError(f"{name} is not a compatible tracking ring")
+        self.last_seq = self.latest_seq()
+    
+    def latest_seq(self):
+        return TRACKING_RING_HEADER.unpack_from(self.shm.buf, 0)[4]
+    
+    def read_slot(self, seq):
+        # The producer writes the leading seq first and the trailing one last, so read
+        # them the other way around: both equal means the copy in between is whole
+        offset = TRACKING_RING_HEADER.size + (seq % self.slots) * TRACKING_RECORD_SIZE
+        end = offset + TRACKING_RECORD_SIZE
+        if TRACKING_SEQ.unpack_from(self.shm.buf, end - TRACKING_SEQ.size)[0] != seq:
+            return None  # Overwritten or still being written
+        data = bytes(self.shm.buf[offset:end])
+        if TRACKING_SEQ.unpack_from(self.shm.buf, offset)[0] != seq:
+            return None
+        return decode_record(data)
+    
+    def latest(self):
+        """Newest record, or None before the first frame"""
+        seq = self.latest_seq()
+        return self.read_slot(seq) if seq else None
+    
+    def read_new(self):
+        """Records published since the last call, oldest first (skips ones already overwritten)"""
+        seq = self.latest_seq()
+        first = max(self.last_seq + 1, seq - self.slots + 1)
+        self.last_seq = seq
+        records = (self.read_slot(s) for s in range(first, seq + 1))
+        return [record for record in records if record is not None]
+    
+    def close(self):
+        self.shm.close()
+
+
+class SocketClient:
+    """Reads the publisher's record stream from its Unix domain socket"""
+    def __init__(self, path=TRACKING_SOCKET_PATH):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(path)
+        magic, record_size = TRACKING_HELLO.unpack(self.recv_exact(TRACKING_HELLO.size))
+        if magic != TRACKING_MAGIC or record_size != TRACKING_RECORD_SIZE:
+            raise ValueError(f"{path} is not a compatible tracking stream")
+    
+    def recv_exact(self, size):
+        buf = bytearray(size)
+        view = memoryview(buf)
+        received = 0
+        while received < size:
+            n = self.sock.recv_into(view[received:])
+            if n == 0:
+                return None
+            received += n
+        return buf
+    
+    def read(self):
+        """Next record, or None when the publisher has closed the stream"""
+        buf = self.recv_exact(TRACKING_RECORD_SIZE)
+        return decode_record(buf) if buf is not None else None
+    
+    def __iter__(self):
+        while True:
+            record = self.read()
+            if record is None:
+                return
+            yield record
+    
+    def close(self):
+        self.sock.close()
+
+
+def describe(record):
+    parts = [f"#{record['seq']}", f"hands={len(record['landmarks'])}"]
+    if record["cursor"] is not None:
+        parts.append(f"cursor={record['cursor']}")
+    if record["pinch_down"]:
+        parts.append("PINCH DOWN")
+    if record["pinch_up"]:
+        parts.append("PINCH UP")
+    if record["bar"] is not None:
+        parts.append(f"bar={record['bar']}")
+    return " ".join(parts)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Print hand tracking published by the Hand-Controlled Desktop UI")
+    parser.add_argument("--shm", nargs="?", const=TRACKING_SHM_NAME, metavar="NAME",
+                        help="poll the shared-memory ring instead of the socket")
+    parser.add_argument("--socket", default=TRACKING_SOCKET_PATH, metavar="PATH",
+                        help="Unix socket to read from")
+    args = parser.parse_args(argv)
+    
+    try:
+        if args.shm:
+            reader = SharedMemoryReader(args.shm)
+            while True:
+                for record in reader.read_new():
+                    print(describe(record))
+                time.sleep(0.01)
+        else:
+            for record in SocketClient(args.socket):
+                print(describe(record))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()